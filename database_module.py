@@ -1,373 +1,958 @@
-import pyodbc
-import logging
-import contextlib
-import threading
-import functools
-import time
-from concurrent.futures import ThreadPoolExecutor
-from typing import Tuple, Optional, Dict, Any, List, Union
-
-# Configuração do logger
-logger = logging.getLogger(__name__)
-
-# Constantes
-DATABASE_PATH = r"\\servidor\geral\SISTEMA ST\BANCO DE DADOS\SSDB_123.accdb"
-CONNECTION_TIMEOUT = 10  # segundos
-MAX_WORKERS = 5  # Número máximo de threads para operações de banco de dados
-
-# Pool de conexões
-connection_pool = []
-connection_pool_lock = threading.Lock()
-connection_pool_max_size = 5
-
-# Cache para resultados frequentes
-index_load_cache = {}
-index_load_cache_lock = threading.Lock()
-index_load_cache_ttl = 300  # 5 minutos
-
-amostragem_cache = {}
-amostragem_cache_lock = threading.Lock()
-amostragem_cache_ttl = 300  # 5 minutos
-
-# Executor para operações assíncronas
-db_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
-
-@contextlib.contextmanager
-def get_connection():
-    """
-    Gerenciador de contexto para conexões com o banco de dados.
-    Implementa pool de conexões para reutilização e melhor desempenho.
-    """
-    conn = None
-    try:
-        # Tenta obter uma conexão do pool
-        with connection_pool_lock:
-            if connection_pool:
-                conn = connection_pool.pop()
-                try:
-                    # Verifica se a conexão ainda está ativa
-                    cursor = conn.cursor()
-                    cursor.execute("SELECT 1")
-                    cursor.close()
-                except Exception:
-                    # Conexão inativa, cria uma nova
-                    try:
-                        conn.close()
-                    except Exception:
-                        pass
-                    conn = None
-
-        # Se não conseguiu do pool, cria uma nova
-        if conn is None:
-            conn = pyodbc.connect(
-                r"Driver={Microsoft Access Driver (*.mdb, *.accdb)};"
-                f"DBQ={DATABASE_PATH};",
-                timeout=CONNECTION_TIMEOUT
-            )
-            # Otimização de desempenho: desabilita autocommit para operações em lote
-            conn.autocommit = False
-
-        yield conn
-        
-        # Confirma todas as transações pendentes
-        conn.commit()
-        
-        # Devolve a conexão para o pool
-        with connection_pool_lock:
-            if len(connection_pool) < connection_pool_max_size:
-                connection_pool.append(conn)
-                conn = None  # Evita fechar a conexão abaixo
-                
-    except pyodbc.Error as e:
-        logger.error(f"Erro de banco de dados: {e}")
-        try:
-            if conn:
-                conn.rollback()
-        except Exception:
-            pass
-        raise
-    finally:
-        if conn:
-            try:
-                conn.close()
-            except Exception:
-                pass
-
-def cached_result(cache_dict, cache_lock, ttl):
-    """
-    Decorador para cache de resultados de funções.
-    
-    Args:
-        cache_dict: Dicionário para armazenar o cache
-        cache_lock: Lock para acesso seguro ao cache
-        ttl: Tempo de vida do cache em segundos
-    """
-    def decorator(func):
-        @functools.wraps(func)
-        def wrapper(*args, **kwargs):
-            # Cria uma chave de cache baseada nos argumentos
-            cache_key = str(args) + str(sorted(kwargs.items()))
-            
-            with cache_lock:
-                if cache_key in cache_dict:
-                    timestamp, result = cache_dict[cache_key]
-                    if time.time() - timestamp < ttl:
-                        return result
-            
-            # Cache miss ou expirado, executa a função
-            result = func(*args, **kwargs)
-            
-            # Atualiza o cache
-            with cache_lock:
-                cache_dict[cache_key] = (time.time(), result)
-            
-            return result
-        return wrapper
-    return decorator
-
-@cached_result(index_load_cache, index_load_cache_lock, index_load_cache_ttl)
-def get_index_load(maquina: str) -> Optional[str]:
-    """
-    Recupera o INDEX_LOAD para a máquina especificada com cache.
-    
-    Args:
-        maquina: ID da máquina
-        
-    Returns:
-        INDEX_LOAD ou None se não encontrado
-    """
-    try:
-        with get_connection() as conn:
-            cursor = conn.cursor()
-            query = "SELECT INDEX_LOAD FROM MAQ_STS WHERE MAQUINA = ?"
-            cursor.execute(query, (maquina,))
-            row = cursor.fetchone()
-            
-            if row:
-                index_load = row[0]
-                logger.info(f"INDEX_LOAD recuperado para máquina {maquina}: {index_load}")
-                return index_load
-            else:
-                logger.warning(f"INDEX_LOAD não encontrado para máquina {maquina}")
-                return None
-    except Exception as e:
-        logger.error(f"Erro ao obter INDEX_LOAD para máquina {maquina}: {e}")
-        return None
-
-@cached_result(amostragem_cache, amostragem_cache_lock, amostragem_cache_ttl)
-def get_amostragem(index_load: str) -> Tuple[Optional[int], Optional[int], Optional[int]]:
-    """
-    Recupera informações de amostragem, quantidade e lote para o INDEX_LOAD com cache.
-    
-    Args:
-        index_load: INDEX_LOAD para consulta
-        
-    Returns:
-        Tupla (amostragem, qtd, lote) ou (None, None, None) se não encontrado
-    """
-    try:
-        with get_connection() as conn:
-            cursor = conn.cursor()
-            query = """
-                SELECT B.AMOSTRAGEM, B.TAM_LOTE, A.QTD
-                FROM CAD_OP_TL A
-                LEFT JOIN CAD_TL B ON A.COD_ITEM = B.INDEX 
-                WHERE A.INDEX = ?
-            """
-            cursor.execute(query, (index_load,))
-            row = cursor.fetchone()
-            
-            if row:
-                amostragem = row[0]
-                lote = row[1]
-                qtd = row[2]
-                logger.info(f"Dados recuperados para INDEX_LOAD {index_load}: amostragem={amostragem}, qtd={qtd}, lote={lote}")
-                return amostragem, qtd, lote
-            else:
-                logger.warning(f"Dados não encontrados para INDEX_LOAD {index_load}")
-                return None, None, None
-    except Exception as e:
-        logger.error(f"Erro ao obter amostragem para INDEX_LOAD {index_load}: {e}")
-        return None, None, None
-
-def update_table_with_cotas(
-    index_load: str, 
-    amostragem: int, 
-    lra_values: List[float], 
-    operador: str, 
-    rem_a: str, 
-    rem_b: str, 
-    qtd: int, 
-    lote: int, 
-    atrib: str
-) -> bool:
-    """
-    Atualiza a tabela com os valores de cotas e informações adicionais.
-    Versão otimizada com transações e batch updates.
-    
-    Args:
-        index_load: INDEX_LOAD para atualização
-        amostragem: Valor de amostragem para o filtro
-        lra_values: Lista de valores dimensionais
-        operador: Nome do operador
-        rem_a: Valor para REM_A
-        rem_b: Valor para REM_B
-        qtd: Quantidade
-        lote: Tamanho do lote
-        atrib: Valor para atributo
-        
-    Returns:
-        True se atualização for bem-sucedida, False caso contrário
-    """
-    try:
-        if not qtd or not lote:
-            logger.warning(f"QTD ou LOTE inválidos para INDEX_LOAD {index_load}")
-            return False
-            
-        total = int(qtd / lote)
-        if total <= 0:
-            logger.warning(f"Total de lotes calculado é zero para INDEX_LOAD {index_load}")
-            return False
-            
-        logger.info(f"Iniciando atualização para INDEX_LOAD {index_load}, amostragem {amostragem}, total {total}")
-        
-        # Otimização: procura em múltiplas tabelas simultaneamente
-        table_names = [f"PIP_TL_PCT_{i}" for i in range(1, total + 1)]
-        update_data = None
-        updated_table = None
-        
-        with get_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Primeiro passo: encontra a tabela correta para atualização
-            for table_name in table_names:
-                select_query = f"SELECT * FROM {table_name} WHERE INDEX = ? AND medicao < ?"
-                cursor.execute(select_query, (index_load, amostragem))
-                row = cursor.fetchone()
-                
-                if row:
-                    column_names = [desc[0].lower() for desc in cursor.description]
-                    current_medicao = row[column_names.index("medicao")]
-                    new_medicao = current_medicao + 1
-                    
-                    # Prepara os dados para atualização
-                    update_values = {"medicao": new_medicao}
-                    
-                    # Atualiza cotas com melhor manipulação de nulos
-                    for idx, medida in enumerate(lra_values):
-                        if idx >= 26:  # Limitado a a-z (26 letras)
-                            break
-                            
-                        cota_base = f"cota_{chr(97 + idx)}"
-                        min_col = f"{cota_base}_min"
-                        max_col = f"{cota_base}_max"
-                        
-                        if min_col in column_names and max_col in column_names:
-                            existing_min = row[column_names.index(min_col)]
-                            existing_max = row[column_names.index(max_col)]
-                            
-                            existing_min = 0 if existing_min is None else existing_min
-                            existing_max = 0 if existing_max is None else existing_max
-                            
-                            update_values[min_col] = medida if existing_min == 0 else min(existing_min, medida)
-                            update_values[max_col] = medida if existing_max == 0 else max(existing_max, medida)
-                    
-                    # Adiciona outros campos de dados
-                    field_mapping = {
-                        "rem_a": rem_a,
-                        "rem_b": rem_b,
-                        "atrib": atrib
-                    }
-                    
-                    for field, value in field_mapping.items():
-                        if field in column_names and value is not None:
-                            update_values[field] = value
-                    
-                    # Atualiza o campo INSP para incluir o operador
-                    if "insp" in column_names:
-                        existing_insp = row[column_names.index("insp")] or ""
-                        inspectors = set(filter(None, [x.strip() for x in existing_insp.split(",")]))
-                        
-                        if operador and operador not in inspectors:
-                            inspectors.add(operador)
-                            update_values["insp"] = ", ".join(inspectors)
-                    
-                    update_values["3DM"] = "OK"
-                    
-                    # Constrói a query de atualização
-                    update_query = f"""
-                        UPDATE {table_name}
-                        SET {', '.join([f'{col} = ?' for col in update_values])}
-                        WHERE INDEX = ?
-                    """
-                    
-                    # Executa a atualização
-                    cursor.execute(update_query, list(update_values.values()) + [index_load])
-                    conn.commit()
-                    
-                    logger.info(f"Tabela {table_name} atualizada com sucesso. Novo valor de MEDICAO: {new_medicao}")
-                    return True
-            
-            logger.warning(f"Não foram encontrados registros para atualizar em nenhuma tabela para INDEX {index_load}")
-            return False
-            
-    except Exception as e:
-        logger.exception(f"Erro ao atualizar tabela para INDEX_LOAD {index_load}: {e}")
-        return False
-
-def clear_cache():
-    """Limpa os caches para forçar nova leitura dos dados."""
-    with index_load_cache_lock:
-        index_load_cache.clear()
-    
-    with amostragem_cache_lock:
-        amostragem_cache.clear()
-    
-    logger.info("Caches limpos com sucesso")
-
-def update_table_async(
-    index_load: str, 
-    amostragem: int, 
-    lra_values: List[float], 
-    operador: str, 
-    rem_a: str, 
-    rem_b: str, 
-    qtd: int, 
-    lote: int, 
-    atrib: str
-) -> None:
-    """
-    Versão assíncrona da função update_table_with_cotas.
-    Agenda a atualização para ser executada em thread separada.
-    
-    Args:
-        Mesmos que update_table_with_cotas
-    """
-    db_executor.submit(
-        update_table_with_cotas,
-        index_load, 
-        amostragem, 
-        lra_values, 
-        operador, 
-        rem_a, 
-        rem_b, 
-        qtd, 
-        lote, 
-        atrib
-    )
-    logger.debug(f"Atualização agendada para INDEX_LOAD {index_load}")
-
-def shutdown():
-    """Finaliza recursos do módulo de banco de dados."""
-    db_executor.shutdown(wait=True)
-    
-    # Fecha todas as conexões no pool
-    with connection_pool_lock:
-        for conn in connection_pool:
-            try:
-                conn.close()
-            except Exception:
-                pass
-        connection_pool.clear()
-    
+import pyodbc
+import logging
+import contextlib
+import threading
+import functools
+import time
+import queue
+import string
+from typing import Tuple, Optional, Dict, Any, List, Union
+
+# Configuração do logger
+logger = logging.getLogger(__name__)
+
+# Constantes
+DATABASE_PATH = r"\\servidor\geral\SISTEMA ST\BANCO DE DADOS\SSDB_123.accdb"
+CONNECTION_TIMEOUT = 10  # segundos
+CONNECTION_VALIDATION_INTERVAL = 30  # segundos sem uso antes de revalidar uma conexão do pool
+CONNECTION_VALIDATION_INTERVAL_NS = CONNECTION_VALIDATION_INTERVAL * 1_000_000_000
+
+# Pool de conexões limitado: cada vaga guarda (conexão, instante monotônico do último uso em ns)
+# ou None enquanto a conexão ainda não foi aberta
+connection_pool_max_size = 5
+connection_pool: "queue.Queue[Optional[Tuple[Any, float]]]" = queue.Queue(maxsize=connection_pool_max_size)
+for _ in range(connection_pool_max_size):
+    connection_pool.put(None)
+
+# Cache para resultados frequentes (LRU com TTL)
+CACHE_MAX_SIZE = 1024  # entradas por cache
+
+index_load_cache_ttl = 300  # 5 minutos
+amostragem_cache_ttl = 300  # 5 minutos
+
+# Cache das queries de localização (UNION ALL) por quantidade de tabelas e de cotas
+# (query, números das tabelas consultadas); só entra no cache com todas as tabelas presentes
+locator_query_cache: Dict[Tuple[int, int], Tuple[str, List[int]]] = {}
+
+# Esquema de cada tabela PIP_TL_PCT_* (o esquema é estático): coluna -> posição
+schema_cache: Dict[str, Dict[str, int]] = {}
+
+# Posição de cada coluna na linha retornada pela query de localização, por quantidade de cotas
+locator_index_cache: Dict[int, Dict[str, int]] = {}
+
+# Colunas fixas lidas na localização, antes dos pares cota_*_min/cota_*_max
+LOCATOR_BASE_COLUMNS = ["medicao", "insp", "rem_a", "rem_b", "atrib"]
+MAX_COTAS = 26  # Limitado a a-z (26 letras)
+COTA_COLUMNS = [(f"cota_{letter}_min", f"cota_{letter}_max") for letter in string.ascii_lowercase]
+
+# Envia os parâmetros do executemany dos lotes em um único array. Desativado
+# até ser validado com o driver do Access (ACE), que pode rejeitar arrays de parâmetros
+USE_FAST_EXECUTEMANY = False
+
+# UPDATE pré-montado por (tabela, quantidade de cotas): (query, colunas na ordem dos parâmetros)
+update_query_cache: Dict[Tuple[str, int], Tuple[str, List[str]]] = {}
+EXTRA_UPDATE_COLUMNS = ["rem_a", "rem_b", "atrib", "insp"]
+
+# Inspetores já gravados no campo INSP, por (tabela, INDEX_LOAD), na ordem gravada
+INSP_CACHE_MAX_SIZE = 4096
+insp_cache: Dict[Tuple[str, str], Dict[str, None]] = {}
+insp_cache_lock = threading.Lock()
+
+# Assinaturas das últimas atualizações aplicadas, para ignorar leituras repetidas.
+# Só vale por alguns segundos: tubos distintos podem ter leituras idênticas, e o
+# reprocessamento do mesmo arquivo já é barrado pela assinatura (mtime, tamanho)
+RECENT_UPDATES_MAX_SIZE = 1024
+RECENT_UPDATES_WINDOW = 5.0
+recent_updates: Dict[Tuple[Any, ...], float] = {}
+recent_updates_lock = threading.Lock()
+
+# Índices usados pelas consultas de busca: (nome do índice, tabela, colunas)
+REQUIRED_INDEXES = [
+    ("IDX_MAQ_STS_MAQUINA", "MAQ_STS", ["MAQUINA"]),
+    ("IDX_CAD_OP_TL_INDEX", "CAD_OP_TL", ["INDEX"]),
+    ("IDX_CAD_TL_INDEX", "CAD_TL", ["INDEX"]),
+]
+PIP_TABLE_PREFIX = "PIP_TL_PCT_"
+PIP_INDEX_COLUMNS = ["INDEX", "medicao"]
+
+# Fila de atualizações assíncronas, consumida em lotes
+UPDATE_WORKERS = 1  # Mais de um consumidor pode disputar o MEDICAO de um mesmo INDEX_LOAD
+UPDATE_BATCH_MAX_SIZE = 200  # atualizações por lote
+UPDATE_BATCH_WINDOW = 0.05  # segundos aguardando novas atualizações para o lote
+update_queue = queue.Queue()
+update_workers = []
+update_workers_lock = threading.Lock()
+
+def open_connection():
+    """Abre uma nova conexão ODBC com o banco Access."""
+    conn = pyodbc.connect(
+        r"Driver={Microsoft Access Driver (*.mdb, *.accdb)};"
+        f"DBQ={DATABASE_PATH};",
+        timeout=CONNECTION_TIMEOUT
+    )
+    # Otimização de desempenho: desabilita autocommit para operações em lote
+    conn.autocommit = False
+    return conn
+
+def prewarm_connection_pool() -> None:
+    """
+    Pré-abre as conexões do pool para que as primeiras operações não
+    paguem o custo de abertura do driver Access pela rede.
+    """
+    opened = 0
+    for _ in range(connection_pool_max_size):
+        try:
+            slot = connection_pool.get(timeout=CONNECTION_TIMEOUT)
+        except queue.Empty:
+            break
+        
+        try:
+            if slot is None:
+                slot = (open_connection(), time.monotonic_ns())
+                opened += 1
+        except Exception as e:
+            logger.warning(f"Falha ao pré-abrir conexão do pool: {e}")
+            break
+        finally:
+            connection_pool.put(slot)
+    
+    logger.info(f"Pool de conexões pré-aquecido com {opened} conexões")
+
+@contextlib.contextmanager
+def get_connection():
+    """
+    Gerenciador de contexto para conexões com o banco de dados.
+    Implementa pool de conexões limitado: quando todas estão em uso,
+    aguarda até CONNECTION_TIMEOUT segundos por uma livre.
+    """
+    try:
+        slot = connection_pool.get(timeout=CONNECTION_TIMEOUT)
+    except queue.Empty:
+        raise pyodbc.Error(f"Nenhuma conexão livre no pool após {CONNECTION_TIMEOUT}s")
+    
+    conn = None
+    try:
+        if slot is not None:
+            conn, last_used = slot
+            
+            # Só revalida conexões ociosas há algum tempo, com uma consulta
+            # de atributo do driver em vez de um SELECT no banco
+            if time.monotonic_ns() - last_used >= CONNECTION_VALIDATION_INTERVAL_NS:
+                try:
+                    conn.getinfo(pyodbc.SQL_DATA_SOURCE_READ_ONLY)
+                except Exception:
+                    # Conexão inativa, cria uma nova
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+                    conn = None
+        
+        # Vaga sem conexão (ou conexão descartada): abre uma nova
+        if conn is None:
+            conn = open_connection()
+        
+        yield conn
+        
+        # Confirma todas as transações pendentes
+        conn.commit()
+        
+        # Devolve a conexão para o pool
+        slot, conn = (conn, time.monotonic_ns()), None
+                
+    except pyodbc.Error as e:
+        logger.error(f"Erro de banco de dados: {e}")
+        try:
+            if conn:
+                conn.rollback()
+        except Exception:
+            pass
+        raise
+    finally:
+        if conn:
+            # Conexão com erro é descartada; a vaga é reaberta no próximo uso
+            try:
+                conn.close()
+            except Exception:
+                pass
+            slot = None
+        connection_pool.put(slot)
+
+def cached_result(ttl, max_size=CACHE_MAX_SIZE):
+    """
+    Decorador para cache de resultados de funções.
+    Delega ao functools.lru_cache (implementado em C, sem lock em Python):
+    a janela de tempo atual (relógio monotônico em ns // ttl) faz parte da
+    chave, então as entradas deixam de ser usadas quando a janela muda e
+    acabam descartadas pela política LRU, que mantém no máximo max_size
+    entradas. O relógio monotônico não é afetado por ajustes do relógio do
+    sistema e a conta é feita só com inteiros.
+    
+    Args:
+        ttl: Tempo de vida do cache em segundos (duração de cada janela)
+        max_size: Quantidade máxima de entradas no cache
+    """
+    ttl_ns = int(ttl * 1_000_000_000)
+    
+    def decorator(func):
+        @functools.lru_cache(maxsize=max_size)
+        def cached_call(time_bucket, *args, **kwargs):
+            return func(*args, **kwargs)
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return cached_call(time.monotonic_ns() // ttl_ns, *args, **kwargs)
+        
+        wrapper.cache_clear = cached_call.cache_clear
+        wrapper.cache_info = cached_call.cache_info
+        return wrapper
+    return decorator
+
+@cached_result(index_load_cache_ttl)
+def get_index_load(maquina: str) -> Optional[str]:
+    """
+    Recupera o INDEX_LOAD para a máquina especificada com cache.
+    
+    Args:
+        maquina: ID da máquina
+        
+    Returns:
+        INDEX_LOAD ou None se não encontrado
+    """
+    try:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            query = "SELECT TOP 1 INDEX_LOAD FROM MAQ_STS WHERE MAQUINA = ?"
+            cursor.execute(query, (maquina,))
+            row = cursor.fetchone()
+            
+            if row:
+                index_load = row[0]
+                logger.info(f"INDEX_LOAD recuperado para máquina {maquina}: {index_load}")
+                return index_load
+            else:
+                logger.warning(f"INDEX_LOAD não encontrado para máquina {maquina}")
+                return None
+    except Exception as e:
+        logger.error(f"Erro ao obter INDEX_LOAD para máquina {maquina}: {e}")
+        return None
+
+@cached_result(amostragem_cache_ttl)
+def get_amostragem(index_load: str) -> Tuple[Optional[int], Optional[int], Optional[int], int]:
+    """
+    Recupera informações de amostragem, quantidade e lote para o INDEX_LOAD com cache.
+    O total de tabelas é calculado uma única vez e guardado junto no cache.
+    
+    Args:
+        index_load: INDEX_LOAD para consulta
+        
+    Returns:
+        Tupla (amostragem, qtd, lote, total) ou (None, None, None, 0) se não encontrado
+    """
+    try:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            query = """
+                SELECT TOP 1 B.AMOSTRAGEM, B.TAM_LOTE, A.QTD
+                FROM CAD_OP_TL A
+                LEFT JOIN CAD_TL B ON A.COD_ITEM = B.INDEX 
+                WHERE A.INDEX = ?
+            """
+            cursor.execute(query, (index_load,))
+            row = cursor.fetchone()
+            
+            if row:
+                amostragem = row[0]
+                lote = row[1]
+                qtd = row[2]
+                total = calculate_total(index_load, qtd, lote)
+                logger.info(f"Dados recuperados para INDEX_LOAD {index_load}: amostragem={amostragem}, qtd={qtd}, lote={lote}, total={total}")
+                return amostragem, qtd, lote, total
+            else:
+                logger.warning(f"Dados não encontrados para INDEX_LOAD {index_load}")
+                return None, None, None, 0
+    except Exception as e:
+        logger.error(f"Erro ao obter amostragem para INDEX_LOAD {index_load}: {e}")
+        return None, None, None, 0
+
+def has_index_on(cursor, table_name: str, column: str) -> bool:
+    """
+    Verifica se já existe um índice cuja primeira coluna é a informada.
+    
+    Args:
+        cursor: Cursor ativo
+        table_name: Nome da tabela
+        column: Nome da coluna
+        
+    Returns:
+        True se a coluna já lidera algum índice da tabela
+    """
+    for stat in cursor.statistics(table=table_name):
+        if stat.column_name and stat.column_name.lower() == column.lower() and stat.ordinal_position == 1:
+            return True
+    return False
+
+def ensure_indexes() -> None:
+    """
+    Cria, se ainda não existirem, os índices usados pelas consultas de busca
+    (MAQ_STS.MAQUINA, CAD_OP_TL.INDEX, CAD_TL.INDEX e PIP_TL_PCT_*(INDEX, medicao)),
+    permitindo que o Access faça busca por índice em vez de varredura completa.
+    Falhas (ex.: tabela em uso por outro usuário) são apenas registradas.
+    Migração única, executada sob demanda com `python main.py --create-indexes`
+    (nunca na inicialização do serviço).
+    """
+    try:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            
+            indexes = list(REQUIRED_INDEXES)
+            pip_tables = [
+                table.table_name for table in cursor.tables(tableType="TABLE")
+                if table.table_name.upper().startswith(PIP_TABLE_PREFIX)
+            ]
+            for table_name in pip_tables:
+                indexes.append((f"IDX_{table_name}_INDEX_MEDICAO", table_name, PIP_INDEX_COLUMNS))
+            
+            for index_name, table_name, columns in indexes:
+                if has_index_on(cursor, table_name, columns[0]):
+                    continue
+                
+                column_list = ", ".join(f"[{col}]" for col in columns)
+                try:
+                    cursor.execute(f"CREATE INDEX {index_name} ON {table_name} ({column_list})")
+                    conn.commit()
+                    logger.info(f"Índice {index_name} criado em {table_name}({column_list})")
+                except pyodbc.Error as e:
+                    conn.rollback()
+                    logger.warning(f"Não foi possível criar o índice {index_name} em {table_name}: {e}")
+    except Exception as e:
+        logger.error(f"Erro ao verificar índices do banco de dados: {e}")
+
+def get_table_schema(cursor, table_name: str) -> Dict[str, int]:
+    """
+    Recupera (com cache) o esquema de uma tabela a partir do catálogo ODBC.
+    
+    Args:
+        cursor: Cursor ativo
+        table_name: Nome da tabela
+        
+    Returns:
+        Dicionário {nome da coluna em minúsculas: posição}; vazio se a tabela
+        não existir (não fica em cache, pois a tabela pode ser criada depois)
+    """
+    schema = schema_cache.get(table_name)
+    if schema is None:
+        schema = {
+            col.column_name.lower(): col.ordinal_position - 1
+            for col in cursor.columns(table=table_name)
+        }
+        if schema:
+            schema_cache[table_name] = schema
+    return schema
+
+def get_locator_columns(num_cotas: int) -> List[str]:
+    """
+    Lista, em ordem fixa, as colunas lidas pela query de localização.
+    
+    Args:
+        num_cotas: Quantidade de cotas (valores dimensionais) a atualizar
+        
+    Returns:
+        Colunas base seguidas dos pares cota_x_min, cota_x_max
+    """
+    columns = list(LOCATOR_BASE_COLUMNS)
+    for min_col, max_col in COTA_COLUMNS[:num_cotas]:
+        columns.append(min_col)
+        columns.append(max_col)
+    return columns
+
+def get_locator_index(num_cotas: int) -> Dict[str, int]:
+    """
+    Recupera (com cache) a posição de cada coluna na linha de localização.
+    A posição 0 é ocupada pelo número da tabela (coluna t).
+    
+    Args:
+        num_cotas: Quantidade de cotas a atualizar
+        
+    Returns:
+        Dicionário {nome da coluna: posição na linha}
+    """
+    col_idx = locator_index_cache.get(num_cotas)
+    if col_idx is None:
+        col_idx = {col: pos for pos, col in enumerate(get_locator_columns(num_cotas), start=1)}
+        locator_index_cache[num_cotas] = col_idx
+    return col_idx
+
+def build_locator_select(cursor, table_number: int, num_cotas: int) -> Optional[str]:
+    """
+    Monta a consulta de localização de uma tabela PIP_TL_PCT_i. Seleciona
+    apenas as colunas necessárias; as inexistentes na tabela retornam NULL
+    para manter as posições fixas (ver get_locator_index).
+    
+    Args:
+        cursor: Cursor ativo (usado para descobrir o esquema no primeiro uso)
+        table_number: Número da tabela PIP_TL_PCT_*
+        num_cotas: Quantidade de cotas a atualizar
+        
+    Returns:
+        SQL com 2 parâmetros (INDEX, medicao) ou None se a tabela não existir
+    """
+    table_name = f"PIP_TL_PCT_{table_number}"
+    existing = get_table_schema(cursor, table_name)
+    if not existing:
+        return None
+    
+    select_list = ", ".join(
+        col if col in existing else f"NULL AS {col}" for col in get_locator_columns(num_cotas)
+    )
+    return f"SELECT {table_number} AS t, {select_list} FROM {table_name} WHERE INDEX = ? AND medicao < ?"
+
+def build_locator_query(cursor, total: int, num_cotas: int) -> Tuple[Optional[str], List[int]]:
+    """
+    Monta (ou recupera do cache) a query UNION ALL que localiza, em uma única
+    ida ao banco, a primeira tabela PIP_TL_PCT_i com registro pendente.
+    Tabelas ausentes do catálogo ficam fora da união (uma tabela inexistente
+    faria a consulta inteira falhar).
+    
+    Args:
+        cursor: Cursor ativo (usado para descobrir o esquema no primeiro uso)
+        total: Quantidade de tabelas PIP_TL_PCT_* a consultar
+        num_cotas: Quantidade de cotas a atualizar
+        
+    Returns:
+        Tupla (SQL com 2 parâmetros (INDEX, medicao) por tabela consultada,
+        números das tabelas consultadas); SQL None se nenhuma tabela existir
+    """
+    cache_key = (total, num_cotas)
+    cached = locator_query_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    selects = []
+    tables = []
+    for i in range(1, total + 1):
+        select = build_locator_select(cursor, i, num_cotas)
+        if select is None:
+            logger.warning(f"Tabela PIP_TL_PCT_{i} não encontrada, ignorada na localização")
+            continue
+        selects.append(select)
+        tables.append(i)
+    
+    query = " UNION ALL ".join(selects) + " ORDER BY t" if selects else None
+    # Com tabelas ausentes a query não é guardada: elas podem ser criadas depois
+    if len(tables) == total:
+        locator_query_cache[cache_key] = (query, tables)
+    return query, tables
+
+def calculate_total(index_load: str, qtd: int, lote: int) -> int:
+    """
+    Calcula a quantidade de tabelas PIP_TL_PCT_* a partir de QTD e LOTE.
+    
+    Args:
+        index_load: INDEX_LOAD (apenas para log)
+        qtd: Quantidade
+        lote: Tamanho do lote
+        
+    Returns:
+        Total de tabelas ou 0 se os valores forem inválidos
+    """
+    if not qtd or not lote:
+        logger.warning(f"QTD ou LOTE inválidos para INDEX_LOAD {index_load}")
+        return 0
+        
+    # Divisão inteira: evita o arredondamento da divisão em ponto flutuante
+    total = int(qtd) // int(lote)
+    if total <= 0:
+        logger.warning(f"Total de lotes calculado é zero para INDEX_LOAD {index_load}")
+        return 0
+    
+    return total
+
+def locate_pending_row(cursor, index_load: str, amostragem: int, total: int, num_cotas: int):
+    """
+    Localiza, em uma única consulta, a primeira tabela com registro pendente.
+    Se a consulta única falhar, consulta as tabelas uma a uma, em ordem.
+    
+    Args:
+        cursor: Cursor ativo
+        index_load: INDEX_LOAD procurado
+        amostragem: Valor de amostragem para o filtro
+        total: Quantidade de tabelas PIP_TL_PCT_*
+        num_cotas: Quantidade de cotas a atualizar
+        
+    Returns:
+        Linha no formato de get_locator_index ou None se não encontrada
+    """
+    locator_query, tables = build_locator_query(cursor, total, num_cotas)
+    if locator_query is None:
+        return None
+    
+    try:
+        cursor.execute(locator_query, [index_load, amostragem] * len(tables))
+        return cursor.fetchone()
+    except pyodbc.Error as e:
+        logger.warning(f"Localização em consulta única falhou para INDEX {index_load}, buscando tabela a tabela: {e}")
+    
+    # Busca sequencial: para na primeira tabela com registro pendente
+    for i in tables:
+        try:
+            cursor.execute(build_locator_select(cursor, i, num_cotas), (index_load, amostragem))
+        except pyodbc.Error as e:
+            logger.warning(f"Falha ao consultar PIP_TL_PCT_{i} para INDEX {index_load}: {e}")
+            continue
+        row = cursor.fetchone()
+        if row:
+            return row
+    return None
+
+def get_update_query(table_name: str, column_names: Dict[str, int], num_cotas: int) -> Tuple[str, List[str]]:
+    """
+    Monta (ou recupera do cache) o UPDATE de texto fixo para a tabela.
+    Todas as colunas existentes são sempre atualizadas (com o valor atual
+    quando não mudam), de modo que o texto da query é constante e o driver
+    pode reaproveitar a preparação.
+    
+    Args:
+        table_name: Nome da tabela
+        column_names: Esquema da tabela (ver get_table_schema)
+        num_cotas: Quantidade de cotas a atualizar
+        
+    Returns:
+        Tupla (query, colunas na ordem dos parâmetros, sem o INDEX final)
+    """
+    cache_key = (table_name, num_cotas)
+    cached = update_query_cache.get(cache_key)
+    if cached is None:
+        columns = ["medicao"]
+        for min_col, max_col in COTA_COLUMNS[:num_cotas]:
+            if min_col in column_names and max_col in column_names:
+                columns.append(min_col)
+                columns.append(max_col)
+        columns.extend(col for col in EXTRA_UPDATE_COLUMNS if col in column_names)
+        columns.append("3DM")
+        
+        update_query = (
+            f"UPDATE {table_name} "
+            f"SET {', '.join([f'{col} = ?' for col in columns])} "
+            f"WHERE INDEX = ?"
+        )
+        cached = (update_query, columns)
+        update_query_cache[cache_key] = cached
+    return cached
+
+def build_update(
+    cursor,
+    row,
+    num_cotas: int,
+    index_load: str,
+    lra_values: List[float],
+    operador: str,
+    rem_a: str,
+    rem_b: str,
+    atrib: str
+) -> Tuple[str, str, List[Any], int, Optional[Dict[str, None]]]:
+    """
+    Monta o UPDATE para a linha localizada por locate_pending_row.
+    
+    Returns:
+        Tupla (tabela, query, parâmetros, novo valor de MEDICAO, inspetores
+        a registrar em insp_cache após o commit ou None)
+    """
+    table_name = f"PIP_TL_PCT_{row[0]}"
+    column_names = get_table_schema(cursor, table_name)
+    col_idx = get_locator_index(num_cotas)
+    current_medicao = row[col_idx["medicao"]]
+    new_medicao = current_medicao + 1
+    
+    # Prepara os dados para atualização
+    update_values = {"medicao": new_medicao}
+    
+    # Atualiza cotas: os pares min/max ocupam posições contíguas no fim da
+    # linha, então são lidos em fatias e calculados de uma vez (nulo ou 0 = vazio)
+    if num_cotas:
+        cota_offset = col_idx[COTA_COLUMNS[0][0]]
+        existing_mins = row[cota_offset::2]
+        existing_maxs = row[cota_offset + 1::2]
+        new_mins = [medida if not existing else min(existing, medida) for existing, medida in zip(existing_mins, lra_values)]
+        new_maxs = [medida if not existing else max(existing, medida) for existing, medida in zip(existing_maxs, lra_values)]
+        
+        # Colunas inexistentes na tabela são ignoradas por get_update_query
+        for (min_col, max_col), new_min, new_max in zip(COTA_COLUMNS, new_mins, new_maxs):
+            update_values[min_col] = new_min
+            update_values[max_col] = new_max
+    
+    # Adiciona outros campos de dados
+    field_mapping = {
+        "rem_a": rem_a,
+        "rem_b": rem_b,
+        "atrib": atrib
+    }
+    
+    # Campos sem valor novo mantêm o valor atual
+    for field, value in field_mapping.items():
+        if field in column_names:
+            update_values[field] = value if value is not None else row[col_idx[field]]
+    
+    # Atualiza o campo INSP para incluir o operador; se o cache já indica
+    # que o operador consta no campo, mantém o valor sem reprocessá-lo
+    inspectors = None
+    if "insp" in column_names:
+        existing_insp = row[col_idx["insp"]]
+        update_values["insp"] = existing_insp
+        known_inspectors = insp_cache.get((table_name, index_load))
+        
+        if operador and (known_inspectors is None or operador not in known_inspectors):
+            # dict.fromkeys remove duplicados preservando a ordem original do campo
+            inspectors = dict.fromkeys(name for name in (x.strip() for x in (existing_insp or "").split(",")) if name)
+            
+            if operador not in inspectors:
+                inspectors[operador] = None
+                update_values["insp"] = ", ".join(inspectors)
+    
+    update_values["3DM"] = "OK"
+    
+    # Query de texto fixo por tabela; parâmetros sempre na mesma ordem
+    update_query, columns = get_update_query(table_name, column_names, num_cotas)
+    params = [update_values[col] for col in columns] + [index_load]
+    
+    return table_name, update_query, params, new_medicao, inspectors
+
+def remember_inspectors(table_name: str, index_load: str, inspectors: Optional[Dict[str, None]]) -> None:
+    """
+    Registra no cache os inspetores gravados após um commit bem-sucedido.
+    
+    Args:
+        table_name: Tabela atualizada
+        index_load: INDEX_LOAD atualizado
+        inspectors: Inspetores retornados por build_update (None = nada a registrar)
+    """
+    if inspectors is None:
+        return
+    
+    with insp_cache_lock:
+        insp_cache[(table_name, index_load)] = inspectors
+        if len(insp_cache) > INSP_CACHE_MAX_SIZE:
+            # Descarta a entrada mais antiga (ordem de inserção)
+            del insp_cache[next(iter(insp_cache))]
+
+def update_signature(
+    index_load: str,
+    lra_values: List[float],
+    operador: str,
+    rem_a: str,
+    rem_b: str,
+    atrib: str
+) -> Tuple[Any, ...]:
+    """Identifica uma atualização pelos dados gravados (sem MEDICAO)."""
+    return (index_load, tuple(lra_values), operador, rem_a, rem_b, atrib)
+
+def is_duplicate_update(signature: Tuple[Any, ...]) -> bool:
+    """Indica se uma atualização idêntica foi aplicada dentro da janela de repetição."""
+    with recent_updates_lock:
+        applied_at = recent_updates.get(signature)
+    return applied_at is not None and time.monotonic() - applied_at < RECENT_UPDATES_WINDOW
+
+def remember_update(signature: Tuple[Any, ...]) -> None:
+    """
+    Registra a assinatura de uma atualização aplicada após o commit,
+    descartando a mais antiga quando o limite é atingido.
+    """
+    with recent_updates_lock:
+        recent_updates.pop(signature, None)
+        recent_updates[signature] = time.monotonic()
+        if len(recent_updates) > RECENT_UPDATES_MAX_SIZE:
+            del recent_updates[next(iter(recent_updates))]
+
+def update_table_with_cotas(
+    index_load: str, 
+    amostragem: int, 
+    lra_values: List[float], 
+    operador: str, 
+    rem_a: str, 
+    rem_b: str, 
+    qtd: int, 
+    lote: int, 
+    atrib: str,
+    total: Optional[int] = None
+) -> bool:
+    """
+    Atualiza a tabela com os valores de cotas e informações adicionais.
+    Versão otimizada com transações e batch updates.
+    
+    Args:
+        index_load: INDEX_LOAD para atualização
+        amostragem: Valor de amostragem para o filtro
+        lra_values: Lista de valores dimensionais
+        operador: Nome do operador
+        rem_a: Valor para REM_A
+        rem_b: Valor para REM_B
+        qtd: Quantidade
+        lote: Tamanho do lote
+        atrib: Valor para atributo
+        total: Total de tabelas já calculado (ver get_amostragem); calculado se omitido
+        
+    Returns:
+        True se atualização for bem-sucedida, False caso contrário
+    """
+    try:
+        # Leitura repetida (mesmo arquivo reprocessado): nada a gravar
+        signature = update_signature(index_load, lra_values, operador, rem_a, rem_b, atrib)
+        if is_duplicate_update(signature):
+            logger.info("Atualização repetida para INDEX_LOAD %s ignorada", index_load)
+            return True
+        
+        if total is None:
+            total = calculate_total(index_load, qtd, lote)
+        if not total:
+            return False
+            
+        logger.info("Iniciando atualização para INDEX_LOAD %s, amostragem %s, total %s", index_load, amostragem, total)
+        
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            
+            # Primeiro passo: localiza a tabela correta com uma única consulta
+            num_cotas = min(len(lra_values), MAX_COTAS)
+            row = locate_pending_row(cursor, index_load, amostragem, total, num_cotas)
+            
+            if row:
+                table_name, update_query, params, new_medicao, inspectors = build_update(
+                    cursor, row, num_cotas, index_load, lra_values, operador, rem_a, rem_b, atrib
+                )
+                
+                # Executa a atualização com execute simples (sem array de
+                # parâmetros): é também o fallback dos lotes que falham
+                cursor.execute(update_query, params)
+                conn.commit()
+                remember_inspectors(table_name, index_load, inspectors)
+                remember_update(signature)
+                
+                logger.info("Tabela %s atualizada com sucesso. Novo valor de MEDICAO: %s", table_name, new_medicao)
+                return True
+            
+            logger.warning(f"Não foram encontrados registros para atualizar em nenhuma tabela para INDEX {index_load}")
+            return False
+            
+    except Exception as e:
+        logger.exception(f"Erro ao atualizar tabela para INDEX_LOAD {index_load}: {e}")
+        return False
+
+def flush_pending_updates(cursor, pending_updates: Dict[str, List[List[Any]]]) -> None:
+    """
+    Executa os UPDATEs acumulados, um executemany por texto de query.
+    
+    Args:
+        cursor: Cursor ativo
+        pending_updates: Dicionário {query: lista de parâmetros}
+    """
+    for update_query, param_seq in pending_updates.items():
+        cursor.executemany(update_query, param_seq)
+    pending_updates.clear()
+
+def update_tables_with_cotas_batch(updates: List[Dict[str, Any]]) -> List[bool]:
+    """
+    Aplica várias atualizações em uma única conexão e transação, agrupando
+    os UPDATEs de mesmo formato em executemany e confirmando uma única vez.
+    Se o lote falhar, cada atualização é reaplicada individualmente.
+    
+    Args:
+        updates: Lista de dicionários com os argumentos de update_table_with_cotas
+        
+    Returns:
+        Lista com o resultado de cada atualização, na mesma ordem
+    """
+    if not updates:
+        return []
+    
+    results = [False] * len(updates)
+    
+    try:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.fast_executemany = USE_FAST_EXECUTEMANY
+            
+            pending_updates: Dict[str, List[List[Any]]] = {}
+            pending_indexes = set()
+            committed_inspectors = []
+            applied_signatures = []
+            
+            for position, update in enumerate(updates):
+                index_load = update["index_load"]
+                lra_values = update["lra_values"]
+                
+                signature = update_signature(
+                    index_load, lra_values, update["operador"],
+                    update["rem_a"], update["rem_b"], update["atrib"]
+                )
+                if is_duplicate_update(signature):
+                    logger.info("Atualização repetida para INDEX_LOAD %s ignorada", index_load)
+                    results[position] = True
+                    continue
+                
+                total = update.get("total")
+                if total is None:
+                    total = calculate_total(index_load, update["qtd"], update["lote"])
+                if not total:
+                    continue
+                
+                # A localização precisa enxergar UPDATEs anteriores do mesmo INDEX_LOAD
+                if index_load in pending_indexes:
+                    flush_pending_updates(cursor, pending_updates)
+                    pending_indexes.clear()
+                
+                num_cotas = min(len(lra_values), MAX_COTAS)
+                row = locate_pending_row(cursor, index_load, update["amostragem"], total, num_cotas)
+                
+                if not row:
+                    logger.warning(f"Não foram encontrados registros para atualizar em nenhuma tabela para INDEX {index_load}")
+                    continue
+                
+                table_name, update_query, params, new_medicao, inspectors = build_update(
+                    cursor, row, num_cotas, index_load, lra_values,
+                    update["operador"], update["rem_a"], update["rem_b"], update["atrib"]
+                )
+                pending_updates.setdefault(update_query, []).append(params)
+                committed_inspectors.append((table_name, index_load, inspectors))
+                applied_signatures.append(signature)
+                pending_indexes.add(index_load)
+                results[position] = True
+                
+                logger.debug("Tabela %s agendada no lote. Novo valor de MEDICAO: %s", table_name, new_medicao)
+            
+            flush_pending_updates(cursor, pending_updates)
+            conn.commit()
+        
+        for table_name, index_load, inspectors in committed_inspectors:
+            remember_inspectors(table_name, index_load, inspectors)
+        for signature in applied_signatures:
+            remember_update(signature)
+        
+        logger.info("Lote de %d atualizações aplicado (%d com sucesso)", len(updates), sum(results))
+        return results
+    
+    except Exception as e:
+        logger.exception(f"Erro ao aplicar lote de {len(updates)} atualizações, aplicando individualmente: {e}")
+        return [update_table_with_cotas(**update) for update in updates]
+
+def clear_cache():
+    """Limpa os caches para forçar nova leitura dos dados."""
+    get_index_load.cache_clear()
+    get_amostragem.cache_clear()
+    
+    with insp_cache_lock:
+        insp_cache.clear()
+    
+    with recent_updates_lock:
+        recent_updates.clear()
+    
+    logger.info("Caches limpos com sucesso")
+
+def update_worker() -> None:
+    """
+    Consome a fila de atualizações: a cada atualização recebida, aguarda até
+    UPDATE_BATCH_WINDOW por outras (no máximo UPDATE_BATCH_MAX_SIZE) e aplica
+    todas em um único lote. Encerra ao receber None.
+    """
+    while True:
+        update = update_queue.get()
+        if update is None:
+            break
+        
+        batch = [update]
+        stop = False
+        deadline = time.monotonic() + UPDATE_BATCH_WINDOW
+        while len(batch) < UPDATE_BATCH_MAX_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                update = update_queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if update is None:
+                stop = True
+                break
+            batch.append(update)
+        
+        try:
+            update_tables_with_cotas_batch(batch)
+        except Exception as e:
+            logger.exception(f"Erro no worker de atualização: {e}")
+        
+        if stop:
+            break
+
+def start_update_workers() -> None:
+    """Inicia, se ainda não estiverem rodando, as threads consumidoras da fila."""
+    with update_workers_lock:
+        if update_workers:
+            return
+        for i in range(UPDATE_WORKERS):
+            worker = threading.Thread(
+                target=update_worker,
+                name=f"UpdateWorker-{i}",
+                daemon=True
+            )
+            worker.start()
+            update_workers.append(worker)
+
+def update_table_async(
+    index_load: str, 
+    amostragem: int, 
+    lra_values: List[float], 
+    operador: str, 
+    rem_a: str, 
+    rem_b: str, 
+    qtd: int, 
+    lote: int, 
+    atrib: str,
+    total: Optional[int] = None
+) -> None:
+    """
+    Versão assíncrona da função update_table_with_cotas.
+    Enfileira a atualização; as threads consumidoras aplicam as atualizações
+    acumuladas em lotes, com uma única transação por lote.
+    
+    Args:
+        Mesmos que update_table_with_cotas
+    """
+    update = {
+        "index_load": index_load,
+        "amostragem": amostragem,
+        "lra_values": lra_values,
+        "operador": operador,
+        "rem_a": rem_a,
+        "rem_b": rem_b,
+        "qtd": qtd,
+        "lote": lote,
+        "atrib": atrib,
+        "total": total,
+    }
+    start_update_workers()
+    update_queue.put(update)
+    logger.debug("Atualização agendada para INDEX_LOAD %s", index_load)
+
+def shutdown():
+    """Finaliza recursos do módulo de banco de dados."""
+    # Sinaliza o fim para cada consumidor e aguarda o processamento pendente
+    with update_workers_lock:
+        for _ in update_workers:
+            update_queue.put(None)
+        for worker in update_workers:
+            worker.join()
+        update_workers.clear()
+    
+    # Fecha todas as conexões livres no pool, mantendo as vagas
+    for _ in range(connection_pool_max_size):
+        try:
+            slot = connection_pool.get_nowait()
+        except queue.Empty:
+            break
+        if slot is not None:
+            try:
+                slot[0].close()
+            except Exception:
+                pass
+        connection_pool.put(None)
+    
     logger.info("Recursos do módulo de banco de dados finalizados")
\ No newline at end of file
@@ -1,26 +1,41 @@
 import threading
 import time
-import json
 import logging
+import logging.handlers
 import os
 import queue
 import signal
+import sys
 import atexit
+import heapq
 import multiprocessing
+import functools
 from functools import lru_cache
+from collections import OrderedDict
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Tuple, Optional, Any, Set, Union
-from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple, Optional, Any, Set, Union, TypedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import orjson
+try:
+    import msgspec  # Opcional: decodificação tipada apenas dos campos usados
+except ImportError:
+    msgspec = None
 from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
+from watchdog.observers.polling import PollingObserver
+from watchdog.events import PatternMatchingEventHandler
 
 # Importações dos módulos otimizados
 from database_module import (
     get_index_load, get_amostragem, update_table_with_cotas, 
-    update_table_async, clear_cache, shutdown as db_shutdown
+    update_table_async, clear_cache, ensure_indexes, prewarm_connection_pool,
+    shutdown as db_shutdown
+)
+from socket_server import (
+    notify_specific_client, start_socket_server, notify_clients, register_command,
+    register_connect_handler, encode_payload
 )
-from socket_server import notify_specific_client, start_socket_server, notify_clients
 
 # Configuração do multiprocessing para melhor desempenho
 multiprocessing.set_start_method('spawn', force=True)
@@ -30,15 +45,41 @@ ROOT_DIRECTORY = r'C:\Users\Engenharia\Documents\Export'
 #ROOT_DIRECTORY = "D:\\Documentos\\Export\\"
 LOG_DIRECTORY = r"C:\Users\Engenharia\Documents\Export"
 FILE_PROCESSING_DELAY = 0.5  # segundos para aguardar estabilização do arquivo
-MAX_PROCESSING_THREADS = 1
-MAX_QUEUE_SIZE = 1000
+PARSE_PROCESSES = os.cpu_count() or 1  # processos para o parse dos arquivos JSON
+MAX_QUEUE_SIZE = 1000  # arquivos em processamento simultâneo (parse + notificação)
+SEEN_FILES_MAX_SIZE = 4096  # arquivos com (mtime, tamanho) lembrados para ignorar eventos sem alteração
+PENDING_MAX_SIZE = 4096  # arquivos aguardando o debounce (excedentes ficam para a reconciliação)
+RECONCILE_INTERVAL = 30  # segundos entre varreduras de reconciliação do diretório
+OBSERVER_POLL_INTERVAL = 2  # segundos entre varreduras do PollingObserver (Windows)
+RECONCILE_STATE_FILE = Path(LOG_DIRECTORY) / "last_scan.txt"  # instante da última varredura
+PROCESSED_STATE_FILE = Path(LOG_DIRECTORY) / "processed_files.txt"  # assinaturas processadas até o encerramento
+JSON_PARSE_RETRIES = 3  # novas tentativas de parse de um arquivo ainda em escrita
+JSON_PARSE_RETRY_DELAY = 0.05  # segundos antes da primeira nova tentativa (dobra a cada uma)
+LAST_PAYLOAD_WINDOW = 5.0  # segundos em que uma mensagem idêntica à anterior não é reenviada ao cliente
 
 # Estruturas de dados para controle de processamento
-processing_queue = queue.Queue(maxsize=MAX_QUEUE_SIZE)
-processing_files = set()
-processing_lock = threading.Lock()
-processing_timers = {}
+processing_slots = threading.BoundedSemaphore(MAX_QUEUE_SIZE)
+# Arquivos em processamento: setdefault/pop são atômicos no dicionário,
+# então a marcação dispensa lock (quem grava a própria marca primeiro vence)
+processing_files: Dict[str, object] = {}
+# Protege a substituição do pool de parse quando um processo morre
+processing_executor_lock = threading.Lock()
+# (mtime_ns, tamanho) de cada arquivo no momento em que foi enfileirado, em
+# ordem LRU: eventos sem alteração real (antivírus, touch) e a reconciliação
+# não reprocessam o mesmo conteúdo
+seen_files: "OrderedDict[str, Tuple[int, int]]" = OrderedDict()
+seen_files_lock = threading.Lock()
+
+# Debounce: prazo mais recente por arquivo e heap (prazo, arquivo) com remoção preguiçosa
+pending_deadlines: Dict[str, float] = {}
+pending_heap: List[Tuple[float, str]] = []
 timer_lock = threading.Lock()
+timer_condition = threading.Condition(timer_lock)
+
+# Última mensagem enviada a cada cliente (chave: machine_id, valor: (JSON serializado,
+# instante monotônico do envio)); mensagem idêntica só é omitida dentro de
+# LAST_PAYLOAD_WINDOW, pois a mesma correção pode valer para o tubo seguinte
+last_payloads: Dict[str, Tuple[bytes, float]] = {}
 
 # Contador de arquivos processados para métricas
 stats = {
@@ -52,9 +93,22 @@ stats_lock = threading.Lock()
 stop_event = threading.Event()
 
 # Configuração do logging
+log_listener: Optional[logging.handlers.QueueListener] = None
+# Fila de registros compartilhada com os processos de parse (criada em setup_logging)
+log_queue: Optional["multiprocessing.Queue"] = None
+
+# Resultados de parse aguardando notificação/atualização (file_path, future);
+# None encerra a thread parsed_file_consumer
+parsed_files: "queue.Queue[Optional[Tuple[str, Any]]]" = queue.Queue()
+parsed_consumer_thread: Optional[threading.Thread] = None
+
 def setup_logging() -> logging.Logger:
     """
     Configura o sistema de logs com rotação de arquivos.
+    Os registros passam por uma fila (QueueHandler) e são formatados e
+    gravados pela thread do log_listener, fora das threads de processamento.
+    A fila é de multiprocessing: os processos de parse também gravam nela
+    (ver setup_worker_logging).
     
     Returns:
         Logger configurado
@@ -83,67 +137,228 @@ def setup_logging() -> logging.Logger:
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(file_format)
     
-    # Adiciona os handlers ao logger
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    # Os handlers reais ficam com o listener; o logger só enfileira os registros
+    global log_listener, log_queue
+    log_queue = multiprocessing.Queue()
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    log_listener = logging.handlers.QueueListener(
+        log_queue, file_handler, console_handler, respect_handler_level=True
+    )
+    log_listener.start()
+    # Garante a descarga dos registros mesmo se main() não chegar a registrar o cleanup
+    atexit.register(stop_log_listener)
     
     return logger
 
-# Inicializa o logger
-logger = setup_logging()
+def setup_worker_logging(worker_log_queue: "multiprocessing.Queue") -> None:
+    """
+    Inicializador dos processos de parse: encaminha os registros para a
+    fila do processo principal, sem abrir o arquivo de log nem iniciar
+    outro listener.
+    
+    Args:
+        worker_log_queue: Fila de registros criada em setup_logging
+    """
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(worker_log_queue))
+
+def stop_log_listener() -> None:
+    """Descarrega os registros pendentes e encerra a thread de log (uma única vez)."""
+    global log_listener
+    if log_listener is not None:
+        log_listener.stop()
+        log_listener = None
+
+def create_processing_executor() -> ProcessPoolExecutor:
+    """Cria o pool de processos para o parse (os processos só são criados no primeiro uso)."""
+    return ProcessPoolExecutor(
+        max_workers=PARSE_PROCESSES,
+        initializer=setup_worker_logging,
+        initargs=(log_queue,)
+    )
+
+# Os processos de parse (spawn) reimportam este módulo: o logger com arquivo
+# e o pool de processos só são criados no processo principal
+if multiprocessing.parent_process() is None:
+    # Inicializa o logger
+    logger = setup_logging()
+    
+    processing_executor: Optional[ProcessPoolExecutor] = create_processing_executor()
+else:
+    logger = logging.getLogger()
+    processing_executor = None
+
+# Esquema dos campos usados do arquivo de inspeção. O msgspec decodifica
+# direto para estes dicionários, descartando em C todos os demais campos;
+# o resultado tem a mesma estrutura do JSON e segue pelo mesmo caminho
+class LRAItem(TypedDict, total=False):
+    Nome: Any
+    Teste: Any
+    Desvio: Any
+
+class LRAGroup(TypedDict, total=False):
+    LRA: List[LRAItem]
 
-# Thread pool para processamento
-processing_executor = ThreadPoolExecutor(max_workers=MAX_PROCESSING_THREADS)
+class DimensionalItem(TypedDict, total=False):
+    Medida: Any
 
-@lru_cache(maxsize=100)
-def get_file_encoding(file_path: str) -> str:
+class TubeInspection(TypedDict, total=False):
+    Machine_id: Any
+    Operador: Any
+    REM_A: Any
+    REM_B: Any
+    ATRIB: Any
+    DIMENSIONAL: List[DimensionalItem]
+    LRA_CORRECTION: List[LRAGroup]
+
+class InspectionFile(TypedDict, total=False):
+    Tube_Inspection: TubeInspection
+
+INSPECTION_DECODER = msgspec.json.Decoder(InspectionFile) if msgspec is not None else None
+
+def strip_bom(raw: bytes) -> Union[bytes, str]:
     """
-    Determina a codificação do arquivo de forma eficiente.
+    Trata a marca de ordem de bytes (BOM) no início do conteúdo.
     
     Args:
-        file_path: Caminho do arquivo
+        raw: Conteúdo bruto do arquivo
         
     Returns:
-        Codificação detectada ou 'latin1' como fallback
+        Bytes UTF-8 sem BOM ou texto já decodificado para arquivos UTF-16
     """
-    encodings = ['utf-8', 'latin1', 'cp1252']
+    if raw[:3] == b"\xef\xbb\xbf":
+        return raw[3:]
+    if raw[:2] in (b"\xff\xfe", b"\xfe\xff"):
+        return raw.decode("utf-16")
+    return raw
+
+def parse_json_bytes(raw: bytes) -> Any:
+    """
+    Faz o parse com o decodificador tipado do msgspec, quando disponível, ou
+    com orjson (UTF-8, o padrão do JSON); o BOM, se houver, é tratado por
+    strip_bom. Conteúdo fora do UTF-8 (exportações em latin1) ou fora do
+    esquema esperado segue para o orjson, que o decodifica novamente.
     
-    for encoding in encodings:
+    Args:
+        raw: Conteúdo bruto do arquivo
+        
+    Returns:
+        Conteúdo do JSON
+    """
+    content = strip_bom(raw)
+    
+    if INSPECTION_DECODER is not None:
+        try:
+            return INSPECTION_DECODER.decode(content)
+        except (msgspec.DecodeError, UnicodeDecodeError):
+            pass
+    
+    try:
+        return orjson.loads(content)
+    except orjson.JSONDecodeError:
+        if isinstance(content, str):
+            raise
         try:
-            with open(file_path, 'r', encoding=encoding) as f:
-                f.read(1024)  # Tenta ler um trecho
-                return encoding
+            str(content, "utf-8")
         except UnicodeDecodeError:
-            continue
+            return orjson.loads(str(content, "latin1"))
+        raise
+
+def load_json_file(file_path: str) -> Any:
+    """
+    Lê o arquivo uma única vez em modo binário e faz o parse (parse_json_bytes).
+    O arquivo não é mapeado em memória: o exportador pode truncá-lo ou
+    reescrevê-lo durante a leitura.
     
-    return 'latin1'  # Fallback padrão
+    Args:
+        file_path: Caminho do arquivo JSON
+        
+    Returns:
+        Conteúdo do JSON
+    """
+    with open(file_path, "rb") as file:
+        return parse_json_bytes(file.read())
 
-def extract_data_from_json(file_path: str) -> Tuple[
+def extract_all(file_path: str) -> Tuple[
     Optional[str], 
     Optional[List[float]], 
     Optional[str], 
     Optional[str], 
     Optional[str], 
-    Optional[str]
+    Optional[str],
+    Dict[str, float]
 ]:
     """
-    Extrai dados estruturados do arquivo JSON de forma eficiente.
+    Lê e faz o parse do arquivo JSON uma única vez, extraindo os dados da
+    inspeção e os dados de falha LRA do mesmo conteúdo. JSON incompleto
+    (arquivo ainda em escrita) é relido até JSON_PARSE_RETRIES vezes, com
+    espera crescente, antes de ser relatado como erro.
     
     Args:
         file_path: Caminho do arquivo JSON
         
     Returns:
-        Tupla (machine_id, dimensional_values, operador, rem_a, rem_b, atrib)
+        Tupla (machine_id, dimensional_values, operador, rem_a, rem_b, atrib, lra_data)
     """
-    try:
-        # Detecta ou usa cache para encoding do arquivo
-        encoding = get_file_encoding(file_path)
+    for attempt in range(JSON_PARSE_RETRIES + 1):
+        try:
+            tube_inspection = load_tube_inspection(file_path)
+            break
+        except orjson.JSONDecodeError as e:
+            if attempt == JSON_PARSE_RETRIES:
+                logger.error(f"Erro de formato JSON no arquivo {file_path}: {e}")
+                return None, None, None, None, None, None, {}
+            logger.debug(f"JSON incompleto em {file_path}, nova tentativa {attempt + 1}/{JSON_PARSE_RETRIES}")
+            time.sleep(JSON_PARSE_RETRY_DELAY * 2 ** attempt)
+        except Exception as e:
+            logger.exception(f"Erro ao ler o arquivo JSON {file_path}: {e}")
+            return None, None, None, None, None, None, {}
+    
+    machine_id, dimensional_values, operador, rem_a, rem_b, atrib = extract_data_from_json(tube_inspection, file_path)
+    if not machine_id or not dimensional_values:
+        return machine_id, dimensional_values, operador, rem_a, rem_b, atrib, {}
+    
+    lra_data = extract_lra_fail_data(tube_inspection, file_path)
+    return machine_id, dimensional_values, operador, rem_a, rem_b, atrib, lra_data
+
+def load_tube_inspection(file_path: str) -> Dict[str, Any]:
+    """
+    Carrega o arquivo uma única vez e devolve o objeto Tube_Inspection,
+    compartilhado pelas funções de extração.
+    
+    Args:
+        file_path: Caminho do arquivo JSON
         
-        with open(file_path, "r", encoding=encoding) as file:
-            # Limitando o tamanho máximo para evitar problemas de memória
-            data = json.loads(file.read(10 * 1024 * 1024))  # 10MB máximo
+    Returns:
+        Dicionário Tube_Inspection (vazio se ausente)
+    """
+    data = load_json_file(file_path)
+    if not isinstance(data, dict):
+        return {}
+    return data.get("Tube_Inspection") or {}
+
+def extract_data_from_json(tube_inspection: Dict[str, Any], file_path: str) -> Tuple[
+    Optional[str], 
+    Optional[List[float]], 
+    Optional[str], 
+    Optional[str], 
+    Optional[str], 
+    Optional[str]
+]:
+    """
+    Extrai dados estruturados do Tube_Inspection já carregado.
+    
+    Args:
+        tube_inspection: Objeto Tube_Inspection do arquivo (ver load_tube_inspection)
+        file_path: Caminho do arquivo (apenas para log)
         
-        tube_inspection = data.get("Tube_Inspection", {})
+    Returns:
+        Tupla (machine_id, dimensional_values, operador, rem_a, rem_b, atrib)
+    """
+    try:
         machine_id = tube_inspection.get("Machine_id")
         operador = tube_inspection.get("Operador", "Desconhecido")
         
@@ -159,73 +374,127 @@ def extract_data_from_json(file_path: str) -> Tuple[
             logger.error(f"Dados inválidos no JSON {file_path}")
             return None, None, None, None, None, None
         
-        # Usa list comprehension para melhor desempenho
+        # Usa list comprehension com uma única leitura de "Medida" por item;
+        # msgspec/orjson só produzem int e float exatos, então basta comparar o tipo
         dimensional_values = [
-            item.get("Medida") for item in dimensional_data
-            if isinstance(item.get("Medida"), (int, float))
+            medida for item in dimensional_data
+            if type(medida := item.get("Medida")) in (int, float)
         ]
         
-        logger.debug(f"Dados extraídos: machine_id={machine_id}, {len(dimensional_values)} valores dimensionais")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Dados extraídos: machine_id={machine_id}, {len(dimensional_values)} valores dimensionais")
         return machine_id, dimensional_values, operador, rem_a, rem_b, atrib
-    except json.JSONDecodeError as e:
-        logger.error(f"Erro de formato JSON no arquivo {file_path}: {e}")
-    except MemoryError:
-        logger.error(f"Erro de memória ao processar arquivo {file_path} - arquivo muito grande")
     except Exception as e:
         logger.exception(f"Erro ao extrair dados do JSON {file_path}: {e}")
     
     return None, None, None, None, None, None
 
-def extract_lra_fail_data(file_path: str) -> Dict[str, float]:
+# Mapeamento dos prefixos LRA (parte do nome antes do "_") para o sufixo desejado
+LRA_PREFIX_MAPPING = {
+    "DOBRA": "dobra",
+    "Length": "tamanho",
+    "GIRO": "giro"
+}
+
+@lru_cache(maxsize=1024)
+def classify_lra_name(nome_original: str) -> Optional[str]:
     """
-    Extrai dados de falha LRA do arquivo JSON de forma otimizada.
+    Converte o nome de um item LRA na chave enviada aos clientes.
+    Os nomes se repetem entre arquivos, então o resultado fica em cache.
     
     Args:
-        file_path: Caminho do arquivo JSON
+        nome_original: Nome do item (ex.: "DOBRA_3")
+        
+    Returns:
+        Chave no formato "{sufixo}_{número}" (ex.: "dobra_3") ou None se não mapeado
+    """
+    # Um único partition + uma consulta ao dicionário
+    prefixo, _, bend_number = nome_original.partition("_")
+    sufixo = LRA_PREFIX_MAPPING.get(prefixo)
+    if sufixo is None or not bend_number:
+        return None
+    return f"{sufixo}_{bend_number}"
+
+def extract_lra_fail_data(tube_inspection: Dict[str, Any], file_path: str) -> Dict[str, float]:
+    """
+    Extrai dados de falha LRA do Tube_Inspection já carregado.
+    
+    Args:
+        tube_inspection: Objeto Tube_Inspection do arquivo (ver load_tube_inspection)
+        file_path: Caminho do arquivo (apenas para log)
         
     Returns:
         Dicionário com dados de falha LRA
     """
     try:
-        # Usa o mesmo encoding já detectado
-        encoding = get_file_encoding(file_path)
-        
-        with open(file_path, "r", encoding=encoding) as file:
-            data = json.loads(file.read(10 * 1024 * 1024))  # 10MB máximo
-        
-        tube_inspection = data.get("Tube_Inspection", {})
         lra_correction = tube_inspection.get("LRA_CORRECTION", [])
         resultado = {}
         
-        # Mapeamento dos prefixos para o sufixo desejado
-        mapping = {
-            "DOBRA": "dobra",
-            "Length": "tamanho",
-            "GIRO": "giro"
-        }
-        
-        # Algoritmo otimizado
+        # Algoritmo otimizado: a classificação de cada nome é memorizada
         for correction in lra_correction:
             for item in correction.get("LRA", []):
-                if item.get("Teste") == "Fail":
-                    nome_original = item.get("Nome", "")
-                    
-                    # Otimiza a busca do prefixo
-                    for prefixo, sufixo in mapping.items():
-                        if nome_original.startswith(prefixo):
-                            # Parse mais eficiente
-                            partes = nome_original.split("_", 1)
-                            if len(partes) > 1:
-                                bend_number = partes[1]
-                                nova_chave = f"{sufixo}_{bend_number}"
-                                resultado[nova_chave] = item.get("Desvio", 0) * -1
-                            break
+                item_get = item.get
+                if item_get("Teste") == "Fail":
+                    nova_chave = classify_lra_name(item_get("Nome", ""))
+                    if nova_chave is not None:
+                        resultado[nova_chave] = -item_get("Desvio", 0)
         
         return resultado
     except Exception as e:
         logger.exception(f"Erro ao extrair dados LRA do arquivo {file_path}: {e}")
         return {}
 
+def prepare_file_update(
+    machine_id: str, 
+    dimensional_values: List[float], 
+    operador: str, 
+    rem_a: str, 
+    rem_b: str, 
+    atrib: str
+) -> Optional[Dict[str, Any]]:
+    """
+    Resolve INDEX_LOAD e amostragem da máquina e monta a atualização no
+    formato dos argumentos de update_table_with_cotas.
+    
+    Args:
+        machine_id: ID da máquina
+        dimensional_values: Lista de valores dimensionais
+        operador: Nome do operador
+        rem_a: Valor para REM_A
+        rem_b: Valor para REM_B
+        atrib: Valor para atributo
+        
+    Returns:
+        Dicionário com os argumentos de update_table_with_cotas ou None se a
+        máquina não tiver INDEX_LOAD/amostragem
+    """
+    # Obtém o INDEX_LOAD para a máquina
+    index_load = get_index_load(machine_id)
+    
+    if index_load is None:
+        logger.warning(f"INDEX_LOAD não encontrado para máquina {machine_id}")
+        return None
+    
+    # Obtém informações de amostragem
+    amostragem, qtd, lote, total = get_amostragem(index_load)
+    
+    if amostragem is None:
+        logger.warning(f"Amostragem não encontrada para máquina {machine_id}, INDEX_LOAD {index_load}")
+        return None
+    
+    return {
+        "index_load": index_load,
+        "amostragem": amostragem,
+        "lra_values": dimensional_values,
+        "operador": operador,
+        "rem_a": rem_a,
+        "rem_b": rem_b,
+        "qtd": qtd,
+        "lote": lote,
+        "atrib": atrib,
+        "total": total,
+    }
+
 def process_file_update(
     machine_id: str, 
     dimensional_values: List[float], 
@@ -251,64 +520,194 @@ def process_file_update(
         True se processado com sucesso, False caso contrário
     """
     try:
-        # Obtém o INDEX_LOAD para a máquina
-        index_load = get_index_load(machine_id)
-        
-        if index_load is None:
-            logger.warning(f"INDEX_LOAD não encontrado para máquina {machine_id}")
-            return False
-        
-        # Obtém informações de amostragem
-        amostragem, qtd, lote = get_amostragem(index_load)
-        
-        if amostragem is None:
-            logger.warning(f"Amostragem não encontrada para máquina {machine_id}, INDEX_LOAD {index_load}")
+        update = prepare_file_update(machine_id, dimensional_values, operador, rem_a, rem_b, atrib)
+        if update is None:
             return False
         
         # Atualiza a tabela com os dados
         if use_async:
-            update_table_async(index_load, amostragem, dimensional_values, operador, rem_a, rem_b, qtd, lote, atrib)
-            logger.info(f"Solicitação de atualização assíncrona enviada para máquina {machine_id}, INDEX_LOAD {index_load}")
+            update_table_async(**update)
+            logger.info("Solicitação de atualização assíncrona enviada para máquina %s, INDEX_LOAD %s", machine_id, update['index_load'])
             return True
         else:
-            result = update_table_with_cotas(index_load, amostragem, dimensional_values, operador, rem_a, rem_b, qtd, lote, atrib)
+            result = update_table_with_cotas(**update)
             if result:
-                logger.info(f"Dados atualizados para máquina {machine_id}, INDEX_LOAD {index_load}")
+                logger.info("Dados atualizados para máquina %s, INDEX_LOAD %s", machine_id, update['index_load'])
             return result
     except Exception as e:
         logger.exception(f"Erro ao processar atualização para máquina {machine_id}: {e}")
         return False
 
-def process_file(file_path: str) -> None:
+def intern_str(value: Any) -> Any:
+    """Interna o valor se for str; outros tipos são devolvidos sem alteração."""
+    return sys.intern(value) if type(value) is str else value
+
+def submit_parse(file_path: str) -> Future:
     """
-    Processa um arquivo JSON completo.
+    Envia o parse do arquivo ao processing_executor. Se o pool estiver
+    quebrado (um processo de parse morreu), ele é substituído por um novo
+    e o envio é repetido uma vez.
     
     Args:
         file_path: Caminho do arquivo a ser processado
+        
+    Returns:
+        Future com o resultado de extract_all
+        
+    Raises:
+        RuntimeError: Pool encerrado ou ainda indisponível após a substituição
+    """
+    global processing_executor
+    executor = processing_executor
+    try:
+        return executor.submit(extract_all, file_path)
+    except BrokenProcessPool:
+        with processing_executor_lock:
+            # Outra thread pode já ter substituído o pool; no encerramento não recria
+            if processing_executor is executor and not stop_event.is_set():
+                logger.warning("Pool de parse quebrado, criando um novo pool")
+                executor.shutdown(wait=False, cancel_futures=True)
+                processing_executor = create_processing_executor()
+            executor = processing_executor
+    return executor.submit(extract_all, file_path)
+
+def process_file(file_path: str) -> None:
+    """
+    Processa um arquivo JSON completo. O parse é feito em um processo do
+    processing_executor (fora do GIL); ao concluir, o resultado segue para
+    a thread parsed_file_consumer, que notifica os clientes e agenda a
+    atualização do banco neste processo.
+    
+    Args:
+        file_path: Caminho do arquivo a ser processado (já marcado e com uma
+            vaga de processing_slots reservada)
+    """
+    with stats_lock:
+        stats["files_processed"] += 1
+        
+    logger.info("Processando arquivo: %s", file_path)
+    
+    try:
+        # Extrai os dados do arquivo (um único parse para inspeção e LRA)
+        future = submit_parse(file_path)
+    except RuntimeError as e:
+        if stop_event.is_set():
+            # Não processado: como os descartados no encerramento (handle_parse_result)
+            forget_file(file_path)
+            release_file(file_path)
+            return
+        # Pool indisponível mesmo após a substituição: faz só este parse aqui
+        logger.warning(f"Pool de parse indisponível, processando {file_path} na thread atual: {e}")
+        future = Future()
+        try:
+            future.set_result(extract_all(file_path))
+        except Exception as parse_error:
+            future.set_exception(parse_error)
+        parsed_files.put((file_path, future))
+        return
+    except Exception:
+        # Falha inesperada antes do envio ao pool: devolve a marca e a vaga
+        release_file(file_path)
+        raise
+    
+    future.add_done_callback(functools.partial(on_parse_done, file_path))
+
+def on_parse_done(file_path: str, future) -> None:
+    """
+    Callback de conclusão do parse submetido ao processing_executor. Roda na
+    thread interna do pool, então apenas repassa o resultado à thread
+    parsed_file_consumer: consultas ao banco aqui impediriam o pool de
+    coletar outros resultados e distribuir novos arquivos.
+    
+    Args:
+        file_path: Caminho do arquivo processado
+        future: Future com o resultado de extract_all
+    """
+    parsed_files.put((file_path, future))
+
+def parsed_file_consumer() -> None:
+    """
+    Thread que consome os resultados de parse (fila parsed_files) e os
+    encaminha a handle_parsed_file. Encerra ao receber None.
+    """
+    logger.info("Iniciando consumidor de arquivos processados")
+    
+    while True:
+        item = parsed_files.get()
+        if item is None:
+            break
+        
+        file_path, future = item
+        try:
+            handle_parse_result(file_path, future)
+        except Exception as e:
+            logger.exception(f"Erro ao tratar resultado do arquivo {file_path}: {e}")
+    
+    logger.info("Consumidor de arquivos processados encerrado")
+
+def handle_parse_result(file_path: str, future) -> None:
+    """
+    Trata o Future do parse: descartado, com erro ou com os dados extraídos.
+    
+    Args:
+        file_path: Caminho do arquivo processado
+        future: Future com o resultado de extract_all
     """
+    if future.cancelled():
+        # Descartado no encerramento: esquece a assinatura para que o arquivo
+        # seja reprocessado na próxima execução
+        forget_file(file_path)
+        release_file(file_path)
+        return
+    
     try:
+        extracted = future.result()
+    except Exception as e:
+        logger.exception(f"Erro ao processar arquivo {file_path}: {e}")
         with stats_lock:
-            stats["files_processed"] += 1
-            
-        logger.info(f"Processando arquivo: {file_path}")
+            stats["processing_errors"] += 1
+        release_file(file_path)
+        return
+    
+    handle_parsed_file(file_path, extracted)
+
+def handle_parsed_file(file_path: str, extracted: Tuple) -> None:
+    """
+    Notifica os clientes e agenda a atualização do banco com os dados
+    extraídos do arquivo. As atualizações são acumuladas em lotes (uma
+    transação por lote) pelas threads consumidoras do database_module.
+    
+    Args:
+        file_path: Caminho do arquivo processado
+        extracted: Tupla retornada por extract_all
+    """
+    try:
+        machine_id, dimensional_values, operador, rem_a, rem_b, atrib, lra_data = extracted
         
-        # Extrai os dados do arquivo
-        machine_id, dimensional_values, operador, rem_a, rem_b, atrib = extract_data_from_json(file_path)
+        # Os mesmos IDs de máquina e operadores se repetem a cada arquivo e são
+        # chaves dos caches; internados aqui (no processo principal, pois o parse
+        # ocorre em outro processo), compartilham um único objeto str
+        machine_id = intern_str(machine_id)
+        operador = intern_str(operador)
         
         if machine_id and dimensional_values:
-            # Processa a atualização dos dados
-            process_file_update(machine_id, dimensional_values, operador, rem_a, rem_b, atrib, use_async=True)
-            
-            # Extrai dados LRA para notificação
-            lra_data = extract_lra_fail_data(file_path)
-            
-            # Notifica os clientes
-            if machine_id:
-                logger.info(f"Notificando cliente específico: {machine_id}")
-                notify_specific_client(lra_data, machine_id)
+            # Notifica os clientes (serializado uma única vez; repetição imediata omitida)
+            payload = encode_payload(lra_data)
+            now = time.monotonic()
+            last_payload, sent_at = last_payloads.get(machine_id, (None, 0.0))
+            if last_payload == payload and now - sent_at < LAST_PAYLOAD_WINDOW:
+                logger.debug("Dados LRA de %s repetidos, notificação omitida", machine_id)
+            elif machine_id:
+                logger.info("Notificando cliente específico: %s", machine_id)
+                # Só registra o que o cliente de fato vai receber
+                if notify_specific_client(payload, machine_id):
+                    last_payloads[machine_id] = (payload, now)
             else:
                 logger.info("Notificando todos os clientes")
-                notify_clients(lra_data)
+                notify_clients(payload)
+            
+            # Processa a atualização dos dados
+            process_file_update(machine_id, dimensional_values, operador, rem_a, rem_b, atrib, use_async=True)
         else:
             logger.warning(f"Dados inválidos ou incompletos no arquivo {file_path}.")
             with stats_lock:
@@ -319,105 +718,284 @@ def process_file(file_path: str) -> None:
         with stats_lock:
             stats["processing_errors"] += 1
     finally:
-        # Remove o arquivo da lista de processamento
-        with processing_lock:
-            if file_path in processing_files:
-                processing_files.remove(file_path)
+        release_file(file_path)
+
+def forget_last_payload(machine_id: str) -> None:
+    """Esquece o último payload enviado ao cliente, para que a próxima leitura seja enviada."""
+    last_payloads.pop(machine_id, None)
+
+def purge_caches() -> None:
+    """Descarta os caches do banco e os últimos payloads enviados (comando PURGE_CACHE)."""
+    clear_cache()
+    last_payloads.clear()
+
+def release_file(file_path: str) -> None:
+    """Remove o arquivo da lista de processamento e libera sua vaga."""
+    processing_files.pop(file_path, None)
+    processing_slots.release()
+
+def file_signature(stat_result: os.stat_result) -> Tuple[int, int]:
+    """Assinatura (mtime_ns, tamanho) usada para detectar arquivos sem alteração."""
+    return stat_result.st_mtime_ns, stat_result.st_size
+
+def file_already_seen(file_path: str, signature: Tuple[int, int]) -> bool:
+    """
+    Verifica se o arquivo já foi enfileirado com a mesma assinatura.
+    
+    Args:
+        file_path: Caminho do arquivo
+        signature: Assinatura atual (ver file_signature)
+        
+    Returns:
+        True se o conteúdo não mudou desde o último enfileiramento
+    """
+    with seen_files_lock:
+        if seen_files.get(file_path) != signature:
+            return False
+        seen_files.move_to_end(file_path)
+        return True
+
+def remember_file(file_path: str, signature: Tuple[int, int]) -> None:
+    """Registra a assinatura do arquivo enfileirado, descartando o mais antigo além de SEEN_FILES_MAX_SIZE."""
+    with seen_files_lock:
+        seen_files[file_path] = signature
+        seen_files.move_to_end(file_path)
+        if len(seen_files) > SEEN_FILES_MAX_SIZE:
+            seen_files.popitem(last=False)
+
+def forget_file(file_path: str) -> None:
+    """Esquece a assinatura de um arquivo que não chegou a ser processado."""
+    with seen_files_lock:
+        seen_files.pop(file_path, None)
+
+def queue_file_for_processing(file_path: str) -> None:
+    """
+    Adiciona arquivo à fila de processamento se não estiver
+    já sendo processado nem inalterado desde o último processamento.
+    """
+    try:
+        signature = file_signature(os.stat(file_path))
+    except OSError as e:
+        logger.warning(f"Arquivo {file_path} indisponível, ignorando: {e}")
+        return
+    
+    if file_already_seen(file_path, signature):
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Arquivo {file_path} sem alteração desde o último processamento, ignorando")
+        return
+    
+    try:
+        # Marca o arquivo como em processamento, se ainda não estiver
+        mark = object()
+        if processing_files.setdefault(file_path, mark) is not mark:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Arquivo {file_path} já está sendo processado, ignorando")
+            return
+        
+        # Reserva uma vaga de processamento (limita os arquivos em andamento)
+        if not processing_slots.acquire(blocking=False):
+            logger.warning("Fila de processamento cheia, evento ignorado")
+            # Remove da lista de processamento se não foi enviado ao pool
+            processing_files.pop(file_path, None)
+            return
+        
+        # Envia direto ao pool de parse
+        remember_file(file_path, signature)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Arquivo {file_path} enviado para processamento")
+        process_file(file_path)
+                
+    except Exception as e:
+        logger.exception(f"Erro ao enfileirar arquivo {file_path}: {e}")
+        # Garante remoção do arquivo da lista em caso de erro e permite
+        # que um novo evento ou a reconciliação tente outra vez
+        processing_files.pop(file_path, None)
+        forget_file(file_path)
+
+def load_last_scan_time() -> float:
+    """
+    Lê o instante da última varredura de reconciliação. Sem registro
+    anterior, parte do instante atual (o histórico do diretório não é
+    reprocessado).
+    """
+    try:
+        return float(RECONCILE_STATE_FILE.read_text().strip())
+    except (OSError, ValueError):
+        return time.time()
+
+def save_last_scan_time(scan_time: float) -> None:
+    """Registra o instante da última varredura de reconciliação."""
+    try:
+        RECONCILE_STATE_FILE.write_text(f"{scan_time}")
+    except OSError as e:
+        logger.warning(f"Não foi possível registrar a última varredura: {e}")
+
+def load_processed_files() -> None:
+    """
+    Restaura as assinaturas dos arquivos processados até o último encerramento,
+    para que a reconciliação não reprocesse os arquivos tratados depois da
+    última varredura registrada (MEDICAO incrementada e notificação repetidas).
+    """
+    try:
+        lines = PROCESSED_STATE_FILE.read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return
+    
+    for line in lines:
+        try:
+            mtime_ns, size, file_path = line.split("\t", 2)
+            remember_file(file_path, (int(mtime_ns), int(size)))
+        except ValueError:
+            continue
+    
+    logger.info(f"{len(seen_files)} assinaturas de arquivos processados restauradas")
+
+def save_processed_files() -> None:
+    """Registra as assinaturas (mtime_ns, tamanho) dos arquivos já processados."""
+    with seen_files_lock:
+        lines = [f"{mtime_ns}\t{size}\t{file_path}\n" for file_path, (mtime_ns, size) in seen_files.items()]
+    
+    # Grava em arquivo temporário e substitui, para não deixar o registro pela metade
+    temp_file = PROCESSED_STATE_FILE.with_suffix(".tmp")
+    try:
+        temp_file.write_text("".join(lines), encoding="utf-8")
+        os.replace(temp_file, PROCESSED_STATE_FILE)
+    except OSError as e:
+        logger.warning(f"Não foi possível registrar os arquivos processados: {e}")
 
-def process_queue_worker() -> None:
-    """Thread worker para processar arquivos da fila."""
-    logger.info("Iniciando worker de processamento de arquivos")
+def reconcile_directory(since: float) -> int:
+    """
+    Enfileira arquivos JSON modificados desde `since` que não passaram pelo
+    monitoramento (eventos perdidos ou recebidos com a aplicação parada).
+    os.scandir traz o nome e os dados de stat sem chamadas extras por arquivo.
+    
+    Args:
+        since: Instante (mtime) a partir do qual os arquivos são considerados
+        
+    Returns:
+        Quantidade de arquivos enfileirados
+    """
+    now = time.time()
+    queued = 0
+    
+    with os.scandir(ROOT_DIRECTORY) as entries:
+        for entry in entries:
+            if not entry.name.lower().endswith(".json") or not entry.is_file():
+                continue
+            
+            stat_result = entry.stat()
+            mtime = stat_result.st_mtime
+            # Arquivos ainda em escrita ficam para o debounce ou a próxima varredura
+            if mtime < since or now - mtime < FILE_PROCESSING_DELAY:
+                continue
+            
+            file_path = entry.path
+            if (file_already_seen(file_path, file_signature(stat_result))
+                    or file_path in processing_files
+                    or file_path in pending_deadlines):
+                continue
+            
+            queue_file_for_processing(file_path)
+            queued += 1
+    
+    return queued
+
+def reconcile_worker() -> None:
+    """
+    Thread de reconciliação: varre o diretório na inicialização e a cada
+    RECONCILE_INTERVAL segundos, enfileirando arquivos que não foram vistos.
+    """
+    logger.info("Iniciando reconciliação periódica do diretório")
+    last_scan = load_last_scan_time()
     
     while not stop_event.is_set():
+        scan_start = time.time()
         try:
-            # Obtém um arquivo da fila com timeout para permitir verificação do evento de parada
-            file_path = processing_queue.get(timeout=0.5)
+            queued = reconcile_directory(last_scan)
+            if queued:
+                logger.info(f"Reconciliação enfileirou {queued} arquivos não processados")
             
-            try:
-                # Processa o arquivo
-                process_file(file_path)
-            finally:
-                # Marca a tarefa como concluída
-                processing_queue.task_done()
-                
-        except queue.Empty:
-            # Fila vazia, apenas continua
-            continue
+            # A próxima varredura recomeça antes deste início para cobrir
+            # os arquivos ignorados por ainda estarem em escrita
+            last_scan = scan_start - FILE_PROCESSING_DELAY
+            save_last_scan_time(last_scan)
         except Exception as e:
-            logger.exception(f"Erro no worker de processamento: {e}")
+            logger.exception(f"Erro na reconciliação do diretório: {e}")
+        
+        stop_event.wait(RECONCILE_INTERVAL)
     
-    logger.info("Worker de processamento de arquivos encerrado")
+    logger.info("Reconciliação do diretório encerrada")
 
-class FileChangeHandler(FileSystemEventHandler):
+def debounce_scheduler() -> None:
+    """
+    Thread única de debounce: enfileira cada arquivo quando seu prazo mais
+    recente expira. Entradas do heap cujo prazo foi substituído por um
+    evento posterior são descartadas ao serem retiradas.
+    """
+    logger.info("Iniciando agendador de debounce de arquivos")
+    
+    while not stop_event.is_set():
+        due_files = []
+        
+        with timer_condition:
+            now = time.monotonic()
+            while pending_heap and pending_heap[0][0] <= now:
+                deadline, file_path = heapq.heappop(pending_heap)
+                if pending_deadlines.get(file_path) == deadline:
+                    del pending_deadlines[file_path]
+                    due_files.append(file_path)
+            
+            if not due_files:
+                # Aguarda o próximo prazo ou um novo evento (com limite para verificar a parada)
+                timeout = pending_heap[0][0] - now if pending_heap else 1.0
+                timer_condition.wait(timeout=min(timeout, 1.0))
+        
+        for file_path in due_files:
+            queue_file_for_processing(file_path)
+    
+    logger.info("Agendador de debounce de arquivos encerrado")
+
+class FileChangeHandler(PatternMatchingEventHandler):
     """
     Manipulador de eventos do sistema de arquivos otimizado.
-    Detecta criação e modificação de arquivos JSON.
+    Recebe apenas eventos de arquivos *.json (filtrados pelo watchdog).
+    Criação e modificação passam pelo mesmo debounce: o PollingObserver
+    informa apenas a criação de um arquivo novo que já chega completo.
     """
+    def __init__(self):
+        super().__init__(patterns=["*.json"], ignore_directories=True)
+
     def on_created(self, event):
-        """Processa arquivo recém-criado."""
+        """Processa arquivo criado."""
         self._handle_file_event(event)
 
     def on_modified(self, event):
         """Processa arquivo modificado."""
         self._handle_file_event(event)
+
+    def on_closed(self, event):
+        """
+        Arquivo fechado após escrita (watchdog >= 2.3, onde o sistema informa):
+        já está completo, então é enfileirado sem aguardar o debounce.
+        """
+        with timer_condition:
+            pending_deadlines.pop(event.src_path, None)
+        queue_file_for_processing(event.src_path)
         
     def _handle_file_event(self, event):
         """
         Lógica comum para manipulação de eventos de arquivo.
-        Implementa debounce para evitar processamento duplicado.
+        Implementa debounce para evitar processamento duplicado: cada evento
+        adia o prazo do arquivo, tratado pela thread debounce_scheduler.
         """
-        if event.is_directory or not event.src_path.endswith(".json"):
-            return
-
-        with timer_lock:
-            # Cancela timer anterior se houver
-            if event.src_path in processing_timers:
-                processing_timers[event.src_path].cancel()
-            
-            # Cria novo timer para aguardar estabilização do arquivo
-            processing_timers[event.src_path] = threading.Timer(
-                FILE_PROCESSING_DELAY, 
-                self._queue_file_for_processing, 
-                [event.src_path]
-            )
-            processing_timers[event.src_path].start()
-
-    def _queue_file_for_processing(self, file_path):
-        """
-        Adiciona arquivo à fila de processamento se não estiver
-        já sendo processado.
-        """
-        try:
-            # Limpa o timer
-            with timer_lock:
-                if file_path in processing_timers:
-                    del processing_timers[file_path]
-            
-            # Verifica se o arquivo já está sendo processado
-            with processing_lock:
-                if file_path in processing_files:
-                    logger.debug(f"Arquivo {file_path} já está sendo processado, ignorando")
-                    return
-                
-                # Marca o arquivo como em processamento
-                processing_files.add(file_path)
-            
-            # Adiciona à fila para processamento
-            try:
-                processing_queue.put_nowait(file_path)
-                logger.debug(f"Arquivo {file_path} adicionado à fila de processamento")
-            except queue.Full:
-                logger.warning("Fila de processamento cheia, evento ignorado")
-                # Remove da lista de processamento se não foi adicionado à fila
-                with processing_lock:
-                    processing_files.remove(file_path)
-                    
-        except Exception as e:
-            logger.exception(f"Erro ao enfileirar arquivo {file_path}: {e}")
-            # Garante remoção do arquivo da lista em caso de erro
-            with processing_lock:
-                if file_path in processing_files:
-                    processing_files.remove(file_path)
+        deadline = time.monotonic() + FILE_PROCESSING_DELAY
+        with timer_condition:
+            if event.src_path not in pending_deadlines and len(pending_deadlines) >= PENDING_MAX_SIZE:
+                logger.warning(f"Limite de {PENDING_MAX_SIZE} arquivos aguardando debounce atingido, {event.src_path} fica para a reconciliação")
+                return
+            pending_deadlines[event.src_path] = deadline
+            heapq.heappush(pending_heap, (deadline, event.src_path))
+            timer_condition.notify()
 
 def print_stats():
     """Imprime estatísticas de processamento."""
@@ -431,7 +1009,7 @@ def print_stats():
     logger.info(f"  - Arquivos processados: {files_processed}")
     logger.info(f"  - Erros de processamento: {errors}")
     logger.info(f"  - Taxa de processamento: {files_processed / elapsed if elapsed > 0 else 0:.2f} arquivos/segundo")
-    logger.info(f"  - Tamanho da fila atual: {processing_queue.qsize()}")
+    logger.info(f"  - Arquivos em processamento: {len(processing_files)}")
 
 def cleanup():
     """Função de limpeza para encerramento adequado do aplicativo."""
@@ -440,26 +1018,35 @@ def cleanup():
     # Sinaliza para todas as threads pararem
     stop_event.set()
     
+    # Encerra o pool de parse: descarta os arquivos ainda não iniciados e
+    # aguarda os em andamento (e seus callbacks) antes de encerrar o banco.
+    # Com stop_event sinalizado o pool não é mais substituído (submit_parse)
+    with processing_executor_lock:
+        executor = processing_executor
+    executor.shutdown(wait=True, cancel_futures=True)
+    
+    # Trata os resultados já recebidos e encerra o consumidor
+    parsed_files.put(None)
+    if parsed_consumer_thread is not None:
+        parsed_consumer_thread.join()
+    logger.info("Processamento de arquivos encerrado com sucesso")
+    
+    # Com o pool drenado, as assinaturas restantes são de arquivos tratados
+    save_processed_files()
+    
     # Limpa cache do módulo de banco de dados
     clear_cache()
     
     # Encerra conexões com banco de dados
     db_shutdown()
     
-    # Aguarda a fila de processamento terminar (com timeout)
-    try:
-        processing_queue.join(timeout=5.0)
-        logger.info("Fila de processamento encerrada com sucesso")
-    except Exception:
-        logger.warning("Timeout ao aguardar término da fila de processamento")
-    
-    # Encerra ThreadPoolExecutor
-    processing_executor.shutdown(wait=False)
-    
     # Imprime estatísticas finais
     print_stats()
     
     logger.info("Limpeza finalizada. Aplicação encerrada.")
+    
+    # Descarrega os registros pendentes e encerra a thread de log
+    stop_log_listener()
 
 def signal_handler(sig, frame):
     """Manipulador de sinais para encerramento limpo."""
@@ -470,14 +1057,19 @@ def signal_handler(sig, frame):
 def start_file_monitor():
     """Inicia o monitoramento de diretório."""
     try:
-        observer = Observer()
+        # No Windows o ReadDirectoryChangesW descarta eventos sob carga;
+        # a varredura periódica do PollingObserver não perde arquivos
+        if sys.platform.startswith("win"):
+            observer = PollingObserver(timeout=OBSERVER_POLL_INTERVAL)
+        else:
+            observer = Observer()
         event_handler = FileChangeHandler()
         observer.schedule(event_handler, path=ROOT_DIRECTORY, recursive=False)
         observer.start()
         logger.info(f"Monitorando diretório: {ROOT_DIRECTORY}")
         
-        while not stop_event.is_set():
-            time.sleep(1)
+        # O observer roda em sua própria thread; apenas aguarda o encerramento
+        stop_event.wait()
         
         observer.stop()
         observer.join(timeout=3.0)
@@ -485,23 +1077,9 @@ def start_file_monitor():
     except Exception as e:
         logger.exception(f"Erro no monitoramento de arquivos: {e}")
 
-def start_worker_threads(num_workers=MAX_PROCESSING_THREADS):
-    """Inicia as threads trabalhadoras para processar a fila."""
-    workers = []
-    for i in range(num_workers):
-        worker = threading.Thread(
-            target=process_queue_worker,
-            name=f"ProcessWorker-{i}",
-            daemon=True
-        )
-        worker.start()
-        workers.append(worker)
-    
-    logger.info(f"{num_workers} threads trabalhadoras iniciadas")
-    return workers
-
 def main():
     """Função principal do aplicativo."""
+    global parsed_consumer_thread
     logger.info("Iniciando aplicação otimizada de monitoramento de arquivos")
     
     # Configura manipuladores de sinais para encerramento limpo
@@ -522,8 +1100,39 @@ def main():
             logger.error(f"Falha ao criar diretório de monitoramento: {e}")
             return 1
     
-    # Inicia as threads trabalhadoras
-    worker_threads = start_worker_threads()
+    # Arquivos tratados desde a última varredura registrada não são reprocessados
+    load_processed_files()
+    
+    # Pré-aquece o pool de conexões em segundo plano (feito aqui e não na
+    # importação, pois os processos de parse também importam os módulos)
+    prewarm_thread = threading.Thread(
+        target=prewarm_connection_pool,
+        daemon=True,
+        name="PoolPrewarm"
+    )
+    prewarm_thread.start()
+    
+    # Inicia o consumidor dos resultados de parse (notificação e banco)
+    parsed_consumer_thread = threading.Thread(
+        target=parsed_file_consumer,
+        daemon=True,
+        name="ParsedFileConsumer"
+    )
+    parsed_consumer_thread.start()
+    
+    # Inicia o agendador de debounce dos eventos de arquivo
+    debounce_thread = threading.Thread(
+        target=debounce_scheduler,
+        daemon=True,
+        name="DebounceScheduler"
+    )
+    debounce_thread.start()
+    
+    # Comando para descartar os caches (ex.: troca de lote prevista)
+    register_command("PURGE_CACHE", purge_caches)
+    
+    # Um cliente que (re)conecta recebe a próxima leitura mesmo que não tenha mudado
+    register_connect_handler(forget_last_payload)
     
     # Inicia servidor de socket em uma thread
     socket_thread = threading.Thread(
@@ -543,10 +1152,18 @@ def main():
     )
     monitor_thread.start()
     
+    # Thread de reconciliação do diretório (arquivos sem evento do monitoramento)
+    reconcile_thread = threading.Thread(
+        target=reconcile_worker,
+        daemon=True,
+        name="Reconcile"
+    )
+    reconcile_thread.start()
+    
     # Thread para imprimir estatísticas periodicamente
     def stats_reporter():
-        while not stop_event.is_set():
-            time.sleep(60)  # A cada minuto
+        # A cada minuto; retorna assim que o encerramento é sinalizado
+        while not stop_event.wait(60):
             print_stats()
     
     stats_thread = threading.Thread(
@@ -573,5 +1190,13 @@ def main():
     return 0
 
 if __name__ == "__main__":
-    exit_code = main()
+    # Migração única e opcional: cria os índices de busca no banco do ERP.
+    # Não roda na inicialização normal, pois altera o esquema de um banco
+    # compartilhado que outros clientes mantêm aberto
+    if "--create-indexes" in sys.argv[1:]:
+        ensure_indexes()
+        stop_log_listener()
+        exit_code = 0
+    else:
+        exit_code = main()
     exit(exit_code)
\ No newline at end of file
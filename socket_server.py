@@ -1,229 +1,325 @@
+import asyncio
 import socket
 import threading
-import json
 import logging
-import queue
 import time
+from collections import deque
+from dataclasses import dataclass, field
+import functools
+try:
+    import uvloop  # Opcional: event loop baseado em libuv (não disponível no Windows)
+except ImportError:
+    uvloop = None
+
+try:
+    import orjson
+
+    def encode_payload(obj):
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+except ImportError:  # Fallback: ujson ou json da biblioteca padrão
+    try:
+        import ujson as json_backend
+    except ImportError:
+        import json as json_backend
+
+    def encode_payload(obj):
+        return (json_backend.dumps(obj) + "\n").encode('utf-8')
 
 logger = logging.getLogger(__name__)
+
+# Keepalive TCP: o sistema detecta clientes mortos sem polling na aplicação
+KEEPALIVE_IDLE = 30  # segundos ocioso antes da primeira sonda
+KEEPALIVE_INTERVAL = 10  # segundos entre sondas
+KEEPALIVE_COUNT = 3  # sondas sem resposta até derrubar a conexão
+USER_TIMEOUT_MS = 60000  # ms com dados enviados sem confirmação até derrubar a conexão (Linux)
+SEND_BUFFER_SIZE = 1 << 20  # bytes do buffer de envio (SO_SNDBUF) de cada cliente
+MAX_CLIENTS = 512  # conexões simultâneas; as excedentes recebem "busy" e são fechadas
+BUSY_REPLY = b"busy\n"
+
+@dataclass
+class Client:
+    """Cliente conectado: nome, conexão e a última mensagem pendente de envio."""
+    name: str
+    writer: asyncio.StreamWriter
+    pending: deque = field(default_factory=lambda: deque(maxlen=1))  # no máximo 1 mensagem
+    event: asyncio.Event = field(default_factory=asyncio.Event)  # sinaliza mensagem pendente
+
 # Estruturas de dados simplificadas
-client_queues = {}  # Filas de mensagens (chave: addr, valor: queue)
-client_names = {}   # Nome dos clientes (chave: addr, valor: nome)
-client_connections = {}  # Conexões ativas (chave: addr, valor: conexão)
+clients = {}        # Clientes conectados (chave: addr, valor: Client)
 name_to_addr = {}   # Mapeamento de nome para endereço (chave: nome, valor: addr)
 lock = threading.Lock()  # Lock para acesso às estruturas compartilhadas
+server_loop = None  # Event loop do servidor; as notificações chegam de outras threads
+command_handlers = {}  # Comandos administrativos (chave: comando em bytes, valor: função sem argumentos)
+connect_handlers = []  # Funções chamadas com o nome de cada cliente registrado
 
-def load_json_from_file(file_path):
-    """Carrega o conteúdo do arquivo JSON."""
-    try:
-        with open(file_path, "r") as file:
-            content = json.load(file)
-        return json.dumps(content)
-    except Exception as e:
-        logger.error(f"Erro ao carregar JSON do arquivo {file_path}: {e}")
-        return "{}"
+def register_command(command, handler):
+    """
+    Registra um comando administrativo que os clientes podem enviar
+    (uma linha contendo apenas o comando, ex.: PURGE_CACHE).
+    
+    Args:
+        command: Nome do comando
+        handler: Função sem argumentos executada fora do event loop
+    """
+    command_handlers[command.encode()] = handler
+
+def register_connect_handler(handler):
+    """
+    Registra uma função chamada sempre que um cliente se registra.
+    
+    Args:
+        handler: Função que recebe o nome do cliente; executada no event loop, deve ser rápida
+    """
+    connect_handlers.append(handler)
 
-def notify_clients(lra_data=None):
-    """Envia o JSON para todos os clientes."""
-    if not lra_data:
-        logger.warning("Nenhum dado LRA para enviar.")
+def log_command_result(command, future):
+    """Registra a falha de um comando administrativo executado fora do event loop."""
+    if future.cancelled():
         return
+    error = future.exception()
+    if error is not None:
+        logger.error(f"Erro ao executar o comando {command}: {error!r}", exc_info=error)
+
+def enqueue_message(client, payload):
+    """
+    Guarda a mensagem como a última pendente do cliente e acorda sua tarefa
+    de envio. Só o estado mais recente interessa: uma mensagem ainda não
+    enviada é substituída pela nova. Executa sempre na thread do event
+    loop, então a deque dispensa lock.
+    """
+    if client.pending:
+        logger.debug("Mensagem pendente do cliente %s substituída pela mais recente", client.name)
+    client.pending.append(payload)
+    client.event.set()
+    logger.debug("Cliente %s marcado para notificação", client.name)
+
+def schedule_message(client, payload):
+    """
+    Encaminha a mensagem, de forma thread-safe, para o event loop do servidor.
     
+    Returns:
+        True se a mensagem foi agendada, False se o servidor estiver inativo
+    """
+    loop = server_loop
+    if loop is None or loop.is_closed():
+        logger.warning(f"Servidor de socket inativo, notificação para {client.name} descartada")
+        return False
     try:
-        json_content = json.dumps(lra_data)
-        logger.debug(f"JSON preparado para envio: {json_content}")
-    except (TypeError, ValueError) as e:
-        logger.error(f"Erro ao converter LRA data em JSON: {e}")
-        return
+        loop.call_soon_threadsafe(enqueue_message, client, payload)
+    except RuntimeError:
+        # O loop foi encerrado entre a verificação e o agendamento
+        logger.warning(f"Servidor de socket encerrado, notificação para {client.name} descartada")
+        return False
+    return True
+
+def notify_clients(payload):
+    """
+    Envia o JSON já serializado para todos os clientes. O mesmo objeto
+    bytes é compartilhado por todas as filas.
+    
+    Args:
+        payload: Mensagem gerada por encode_payload (bytes terminados em nova linha)
+    """
+    logger.debug("JSON preparado para envio (%d bytes)", len(payload))
     
+    # Sob o lock apenas copia as referências; o envio é agendado fora dele
     with lock:
-        client_count = len(client_names)
-        logger.info(f"Notificando {client_count} clientes sobre atualização de dados")
-        
-        # Adiciona o JSON à fila de cada cliente
-        for addr in list(client_queues.keys()):
-            try:
-                client_queues[addr].put_nowait(json_content)
-                logger.debug(f"Cliente {client_names.get(addr, addr)} marcado para notificação")
-            except queue.Full:
-                logger.warning(f"Fila do cliente {client_names.get(addr, addr)} está cheia, ignorando notificação")
-
-def notify_specific_client(lra_data, target_client):
-    """Envia dados apenas para um cliente específico identificado pelo nome."""
-    logger.debug(f"Clientes conectados no momento: {list(client_names.values())}")
+        targets = list(clients.values())
     
-    try:
-        json_content = json.dumps(lra_data)
-    except (TypeError, ValueError) as e:
-        logger.error(f"Erro ao converter LRA data em JSON para cliente {target_client}: {e}")
-        return
+    logger.info("Notificando %d clientes sobre atualização de dados", len(targets))
     
-    with lock:
-        # Usa o mapeamento inverso para encontrar o cliente rapidamente
-        if target_client in name_to_addr:
-            addr = name_to_addr[target_client]
-            if addr in client_queues:
-                try:
-                    client_queues[addr].put_nowait(json_content)
-                    logger.info(f"Cliente {target_client} marcado para receber dados")
-                except queue.Full:
-                    logger.warning(f"Fila do cliente {target_client} está cheia, ignorando notificação")
-            else:
-                logger.warning(f"Fila do cliente {target_client} não encontrada")
-        else:
-            logger.warning(f"Cliente alvo {target_client} não encontrado entre os clientes conectados")
-
-def sender_thread(conn, addr, message_queue):
-    """Thread dedicada para enviar mensagens ao cliente."""
-    client_name = client_names.get(addr, f"Cliente_{addr[1]}")
+    # Adiciona o JSON à fila de cada cliente
+    for client in targets:
+        schedule_message(client, payload)
+
+def notify_specific_client(payload, target_client):
+    """
+    Envia o JSON já serializado apenas para um cliente específico
+    identificado pelo nome.
+    
+    Args:
+        payload: Mensagem gerada por encode_payload (bytes terminados em nova linha)
+        target_client: Nome do cliente
+        
+    Returns:
+        True se a mensagem foi agendada para o cliente, False caso contrário
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Clientes conectados no momento: %s", [client.name for client in clients.values()])
     
+    # Sob o lock apenas resolve o cliente; o envio é agendado fora dele
+    with lock:
+        client = clients.get(name_to_addr.get(target_client))
+
+    if client is None:
+        logger.warning(f"Cliente alvo {target_client} não encontrado entre os clientes conectados")
+        return False
+
+    if not schedule_message(client, payload):
+        return False
+    logger.info("Cliente %s marcado para receber dados", target_client)
+    return True
+
+async def sender(client):
+    """Tarefa dedicada a enviar as mensagens pendentes ao cliente."""
+    client_name = client.name
+    writer = client.writer
     try:
         while True:
-            try:
-                # Tenta obter uma mensagem da fila com um timeout curto
-                message = message_queue.get(timeout=0.5)
+            await client.event.wait()
+            # Novas mensagens durante o envio voltam a sinalizar o evento
+            client.event.clear()
+            
+            while client.pending:
+                message = client.pending.popleft()
                 
-                # Envia a mensagem imediatamente
                 start_time = time.time()
-                logger.info(f"Enviando JSON atualizado para '{client_name}'")
+                logger.info("Enviando JSON atualizado para '%s'", client_name)
                 
-                conn.sendall((message + "\n").encode('utf-8'))
-                message_queue.task_done()
+                # A mensagem já vem serializada em bytes e terminada em \n
+                writer.write(message)
+                await writer.drain()
                 
                 # Log de tempo para monitoramento de performance
                 elapsed = (time.time() - start_time) * 1000
-                logger.debug(f"Envio para '{client_name}' completado em {elapsed:.2f}ms")
-                
-            except queue.Empty:
-                # Sem mensagens para enviar, apenas continua o loop
-                continue
-                
-            except (BrokenPipeError, ConnectionResetError, OSError) as e:
-                logger.error(f"Erro ao enviar dados para '{client_name}': {e}")
-                break
-                
-    except Exception as e:
-        logger.exception(f"Erro inesperado na thread de envio para '{client_name}': {e}")
-    
-    logger.info(f"Thread de envio para '{client_name}' encerrada")
+                logger.debug("Envio para '%s' completado em %.2fms", client_name, elapsed)
+            
+    except (BrokenPipeError, ConnectionResetError, OSError) as e:
+        logger.error(f"Erro ao enviar dados para '{client_name}': {e}")
     
-    # Limpa recursos quando a thread termina
+    logger.info(f"Tarefa de envio para '{client_name}' encerrada")
+
+def remove_client(addr):
+    """Remove as referências ao cliente, se ainda pertencerem a esta conexão."""
+    with lock:
+        client = clients.pop(addr, None)
+        if client is not None:
+            if name_to_addr.get(client.name) == addr:
+                del name_to_addr[client.name]
+            logger.info(f"Cliente '{client.name}' ({addr}) removido.")
+
+def configure_client_socket(sock):
+    """
+    Ajusta a conexão do cliente: desativa o algoritmo de Nagle (envio
+    imediato das mensagens pequenas), amplia o buffer de envio e ativa o
+    keepalive TCP. As opções de tempo do keepalive só são aplicadas quando
+    a plataforma as oferece (Linux e Windows 10+); TCP_USER_TIMEOUT também
+    derruba a conexão quando os envios ficam sem confirmação (Linux).
+    """
+    if sock is None:
+        return
     try:
-        with lock:
-            if addr in client_names:
-                disconnected_name = client_names[addr]
-                logger.info(f"Cliente '{disconnected_name}' ({addr}) removido.")
-                
-                # Limpa todas as referências ao cliente
-                del client_names[addr]
-                if addr in client_queues:
-                    del client_queues[addr]
-                if addr in client_connections:
-                    del client_connections[addr]
-                if disconnected_name in name_to_addr and name_to_addr[disconnected_name] == addr:
-                    del name_to_addr[disconnected_name]
-    except Exception as e:
-        logger.exception(f"Erro ao limpar recursos do cliente '{client_name}': {e}")
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SEND_BUFFER_SIZE)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        for option, value in (
+            ("TCP_KEEPIDLE", KEEPALIVE_IDLE),
+            ("TCP_KEEPINTVL", KEEPALIVE_INTERVAL),
+            ("TCP_KEEPCNT", KEEPALIVE_COUNT),
+            ("TCP_USER_TIMEOUT", USER_TIMEOUT_MS),
+        ):
+            if hasattr(socket, option):
+                sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, option), value)
+    except OSError as e:
+        logger.warning(f"Não foi possível configurar a conexão do cliente: {e}")
 
-def handle_client(conn, addr):
+async def handle_client(reader, writer):
+    addr = writer.get_extra_info('peername')
     client_name = ""
-    sender = None
+    send_task = None
+    logger.info(f"Nova conexão recebida de {addr}")
+    configure_client_socket(writer.get_extra_info('socket'))
     
     try:
         # Recebe o nome do cliente com timeout
-        conn.settimeout(5)
-        client_name = conn.recv(1024).decode().strip() or f"Cliente_{addr[1]}"
-        conn.settimeout(None)  # Remove o timeout
+        data = await asyncio.wait_for(reader.read(1024), timeout=5)
+        client_name = data.decode().strip() or f"Cliente_{addr[1]}"
+        
+        # Limita os clientes simultâneos (uma reconexão com o mesmo nome substitui a anterior)
+        if len(clients) >= MAX_CLIENTS and client_name not in name_to_addr:
+            logger.warning(f"Limite de {MAX_CLIENTS} clientes atingido, recusando '{client_name}' de {addr}")
+            writer.write(BUSY_REPLY)
+            await writer.drain()
+            return
+        
+        client = Client(client_name, writer)
         
         with lock:
             # Verifica se já existe um cliente com o mesmo nome
-            if client_name in name_to_addr:
-                old_addr = name_to_addr[client_name]
-                if old_addr in client_connections and old_addr != addr:
-                    logger.info(f"Cliente duplicado '{client_name}' detectado. Fechando conexão anterior.")
-                    
-                    # Tenta fechar a conexão anterior
-                    try:
-                        client_connections[old_addr].close()
-                    except Exception as e:
-                        logger.error(f"Erro ao fechar conexão duplicada: {e}")
-                    
-                    # A limpeza dos recursos será feita pela thread do sender quando terminar
+            old_addr = name_to_addr.get(client_name)
+            old_client = clients.get(old_addr) if old_addr != addr else None
+            if old_client is not None:
+                logger.info(f"Cliente duplicado '{client_name}' detectado. Fechando conexão anterior.")
+                # A limpeza dos recursos será feita pela tarefa da conexão anterior
+                old_client.writer.close()
             
             # Configura o novo cliente
-            client_queues[addr] = queue.Queue(maxsize=100)  # Limita a 100 mensagens em fila
-            client_names[addr] = client_name
-            client_connections[addr] = conn
+            clients[addr] = client
             name_to_addr[client_name] = addr
         
         logger.info(f"Cliente '{client_name}' conectado de {addr}")
         
-        # Inicia a thread de envio
-        sender = threading.Thread(
-            target=sender_thread, 
-            args=(conn, addr, client_queues[addr]),
-            daemon=True
-        )
-        sender.start()
+        for handler in connect_handlers:
+            try:
+                handler(client_name)
+            except Exception as e:
+                logger.exception(f"Erro ao notificar a conexão do cliente '{client_name}': {e}")
+        
+        # Inicia a tarefa de envio
+        send_task = asyncio.create_task(sender(client))
         
-        # Loop simples para manter a conexão aberta e detectar desconexões
+        # Aguarda até o cliente desconectar; os dados recebidos são ignorados
         while True:
-            try:
-                # Define um timeout longo para detectar desconexão sem muitas verificações
-                conn.settimeout(60)
-                data = conn.recv(1024)
-                if not data:
-                    logger.info(f"Cliente '{client_name}' desconectou normalmente.")
-                    break
-                # Os dados do cliente são ignorados, só verificamos se a conexão ainda está viva
-            except socket.timeout:
-                # Timeout é normal, apenas continua
-                continue
-            except (ConnectionResetError, BrokenPipeError, OSError) as e:
-                logger.error(f"Conexão perdida com cliente '{client_name}': {e}")
+            read_task = asyncio.ensure_future(reader.read(1024))
+            done, _ = await asyncio.wait({read_task, send_task}, return_when=asyncio.FIRST_COMPLETED)
+            if send_task in done:
+                read_task.cancel()
+                break
+            data = read_task.result()
+            if not data:
+                logger.info(f"Cliente '{client_name}' desconectou normalmente.")
                 break
+            # Demais dados do cliente são ignorados, exceto comandos registrados
+            for line in data.splitlines():
+                handler = command_handlers.get(line.strip())
+                if handler is not None:
+                    command = line.strip().decode()
+                    logger.info(f"Comando {command} recebido de '{client_name}'")
+                    future = asyncio.get_running_loop().run_in_executor(None, handler)
+                    future.add_done_callback(functools.partial(log_command_result, command))
                 
-    except socket.timeout:
+    except asyncio.TimeoutError:
         logger.warning(f"Timeout ao receber nome do cliente {addr}")
-    except (ConnectionResetError, BrokenPipeError, socket.error) as e:
-        logger.error(f"Erro de conexão com '{client_name}': {e}")
+    except (ConnectionResetError, BrokenPipeError, OSError) as e:
+        logger.error(f"Conexão perdida com cliente '{client_name}': {e}")
     except Exception as e:
         logger.exception(f"Erro inesperado no tratamento do cliente '{client_name}': {e}")
     finally:
+        if send_task is not None:
+            send_task.cancel()
+        remove_client(addr)
+        
         # Tenta fechar a conexão
         try:
-            conn.close()
+            writer.close()
         except Exception:
             pass
-        
-        # A limpeza das estruturas será feita pela thread de envio quando terminar
+
+async def serve(host, port):
+    """Executa o servidor asyncio: um único event loop atende todos os clientes."""
+    global server_loop
+    server_loop = asyncio.get_running_loop()
+    server = await asyncio.start_server(handle_client, host, port, backlog=100, reuse_address=True)
+    logger.info(f"Servidor de socket iniciado em {host}:{port}")
+    async with server:
+        await server.serve_forever()
 
 def start_socket_server(host, port):
     """Inicia o servidor de socket para comunicação com clientes."""
     try:
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            s.bind((host, port))
-            s.listen(100)
-            logger.info(f"Servidor de socket iniciado em {host}:{port}")
-            
-            while True:
-                try:
-                    conn, addr = s.accept()
-                    logger.info(f"Nova conexão recebida de {addr}")
-                    
-                    # Inicia thread para lidar com o cliente
-                    client_thread = threading.Thread(
-                        target=handle_client, 
-                        args=(conn, addr), 
-                        daemon=True
-                    )
-                    client_thread.start()
-                except (ConnectionResetError, OSError) as e:
-                    logger.error(f"Erro ao aceitar conexão: {e}")
-                except Exception as e:
-                    logger.exception(f"Erro inesperado ao aceitar conexão: {e}")
-                
+        if uvloop is not None:
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        asyncio.run(serve(host, port))
     except OSError as e:
         logger.critical(f"Não foi possível iniciar o servidor de socket: {e}")
     except Exception as e: